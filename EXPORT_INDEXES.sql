@@ -0,0 +1,3 @@
+-- Indexes for streaming /export (keyset pagination on id per user)
+CREATE INDEX IF NOT EXISTS idx_flashcards_user_id_id ON flashcards(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_journal_entries_user_id_id ON journal_entries(user_id, id);
@@ -0,0 +1,12 @@
+-- Rolling weekly/monthly journal summaries for /insights
+CREATE TABLE IF NOT EXISTS journal_insights (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    period TEXT NOT NULL,            -- 'week' or 'month'
+    period_start DATE NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    last_entry_id BIGINT NOT NULL DEFAULT 0,  -- newest journal entry folded in
+    entry_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (user_id, period, period_start)
+);
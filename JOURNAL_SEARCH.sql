@@ -0,0 +1,46 @@
+-- Full-text search over journal entries (used by /search)
+
+-- Search vector maintained by Postgres on every insert/update
+ALTER TABLE journal_entries
+    ADD COLUMN IF NOT EXISTS entry_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(entry, ''))) STORED;
+
+-- Create indexes for fast ranked search per user
+CREATE INDEX IF NOT EXISTS idx_journal_entries_entry_tsv ON journal_entries USING GIN (entry_tsv);
+CREATE INDEX IF NOT EXISTS idx_journal_entries_user_id ON journal_entries(user_id);
+
+-- Ranked, highlighted, paginated search. Highlights use <b></b> on
+-- HTML-escaped text so results can be sent with parse_mode='HTML'.
+CREATE OR REPLACE FUNCTION search_journal_entries(
+    p_user_id TEXT,
+    p_query TEXT,
+    p_limit INT DEFAULT 5,
+    p_offset INT DEFAULT 0
+)
+RETURNS TABLE (id BIGINT, entry_date TEXT, headline TEXT, rank REAL, total BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ),
+    page AS (
+        SELECT j.id, j.entry_date::text AS entry_date, j.entry,
+               ts_rank_cd(j.entry_tsv, q.query) AS rank,
+               count(*) OVER () AS total
+        FROM journal_entries j, q
+        WHERE j.user_id = p_user_id AND j.entry_tsv @@ q.query
+        ORDER BY rank DESC, j.entry_date DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    -- Headlines are only computed for the rows on this page
+    SELECT p.id, p.entry_date,
+           ts_headline(
+               'english',
+               replace(replace(replace(p.entry, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'),
+               q.query,
+               'StartSel=<b>, StopSel=</b>, MinWords=10, MaxWords=30, MaxFragments=2, FragmentDelimiter=" … "'
+           ) AS headline,
+           p.rank, p.total
+    FROM page p, q
+    ORDER BY p.rank DESC, p.entry_date DESC;
+$$;
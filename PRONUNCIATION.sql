@@ -0,0 +1,20 @@
+-- Pronunciation score history (one compact row per analyzed attempt)
+CREATE TABLE IF NOT EXISTS pronunciation_scores (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    score SMALLINT NOT NULL,
+    words TEXT[] NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pronunciation_scores_user_id_id ON pronunciation_scores(user_id, id);
+
+-- Per-user rollup, updated on every attempt: daily aggregates for /stats and
+-- the weakness index (decayed weights per word and sound) for shadowing
+CREATE TABLE IF NOT EXISTS pronunciation_profile (
+    user_id TEXT PRIMARY KEY,
+    attempts INT NOT NULL DEFAULT 0,
+    daily JSONB NOT NULL DEFAULT '{}',      -- {"YYYY-MM-DD": [attempts, score_sum]}
+    weakness JSONB NOT NULL DEFAULT '{}',   -- {"word:think": 1.8, "sound:th": 2.6}
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
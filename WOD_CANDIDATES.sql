@@ -0,0 +1,30 @@
+-- Precomputed Word of the Day candidates (filled nightly, consumed at 09:00)
+CREATE TABLE IF NOT EXISTS wod_candidates (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    definition TEXT,
+    chinese TEXT,
+    example TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Create index for taking the oldest candidate per user
+CREATE INDEX IF NOT EXISTS idx_wod_candidates_user_id_id ON wod_candidates(user_id, id);
+
+-- Atomically take the oldest candidate for a user (used by the 09:00 job).
+-- SKIP LOCKED means two concurrent callers never get the same row.
+CREATE OR REPLACE FUNCTION pop_wod_candidate(p_user_id TEXT)
+RETURNS TABLE (word TEXT, definition TEXT, chinese TEXT, example TEXT)
+LANGUAGE sql
+AS $$
+    DELETE FROM wod_candidates
+    WHERE id = (
+        SELECT id FROM wod_candidates
+        WHERE user_id = p_user_id
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING wod_candidates.word, wod_candidates.definition, wod_candidates.chinese, wod_candidates.example;
+$$;
@@ -1,16 +1,26 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes, JobQueue
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, TypeHandler, filters, ContextTypes, JobQueue
 import os
 from dotenv import load_dotenv
 from datetime import time, datetime
 import pytz
 import random
 import asyncio
+import html
 
-from services.gemini_ai import lookup_word, generate_word_of_day, analyze_audio_file, generate_journal_prompt, generate_weekly_mission
-from services.database import save_flashcard, get_flashcards, save_journal, save_mission_completion, get_random_journal, save_user, get_all_users
+from services.gemini_ai import lookup_word, analyze_audio_file, generate_journal_prompt, generate_weekly_mission
+from services.database import save_flashcard, get_flashcards, save_journal, save_mission_completion, get_random_journal, save_user, get_all_users, search_journals, get_journals_by_ids
 from services.tts import text_to_speech
+from services.dictionary import get_dictionary
+from services.known_words import known_words
+from services.word_of_day import precompute_word_of_day, next_word_of_day
+from services.pronunciation import record_attempt, get_weak_targets, get_pronunciation_trend
+from services.memory_index import memory_index
+from services.insights import refresh_insights, refresh_insights_background
+from services.analysis_cache import analysis_cache, cache_key, hash_file
+from services.scheduler import background_job, set_ai_context, INTERACTIVE
+from services.export import export_flashcards_csv, export_flashcards_anki, export_journals_csv, import_flashcards_csv
 from services.shadowing import generate_shadowing_task, create_reference_audio, analyze_voice_attempt
 
 load_dotenv()
@@ -23,6 +33,10 @@ logger = logging.getLogger(__name__)
 user_shadowing_tasks = {}
 user_journal_states = {} # chat_id -> prompt_text
 user_review_states = {} # chat_id -> {words: [], index: 0}
+user_search_states = {} # chat_id -> {query: str, user_id: int}
+user_import_states = set() # chat_ids waiting for an import file
+
+SEARCH_PAGE_SIZE = 5
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send welcome message and set up schedules."""
@@ -55,7 +69,11 @@ I'm your 24/7 AI Coach powered by Gemini 1.5 Flash (Fast!).
 /wod - Get Word of the Day now
 /journal - Get Journal prompt now
 /shadowing - Get Shadowing task now
-/memory - See a random past journal
+/memory - See a random past journal (or /memory <topic>)
+/search - Search your journal
+/insights - Weekly & monthly journal insights
+/export - Download flashcards (CSV/Anki)
+/import - Upload flashcards from CSV
 
 Let's start! Send me a word to define."""
     await update.message.reply_text(welcome_msg, parse_mode='Markdown')
@@ -68,7 +86,7 @@ async def schedule_user_jobs(job_queue, chat_id, user_id):
 
     # 1. Word of the Day (9 AM)
     job_queue.run_daily(
-        send_word_of_day,
+        background_job(send_word_of_day),
         time=time(hour=9, minute=0, tzinfo=pytz.timezone('America/New_York')),
         chat_id=chat_id,
         name=f'wod_{user_id}'
@@ -76,7 +94,7 @@ async def schedule_user_jobs(job_queue, chat_id, user_id):
     
     # 2. Weekly Mission (Monday 9 AM)
     job_queue.run_daily(
-        send_weekly_mission,
+        background_job(send_weekly_mission),
         time=time(hour=9, minute=0, tzinfo=pytz.timezone('America/New_York')),
         days=(1,), # Monday
         chat_id=chat_id,
@@ -85,7 +103,7 @@ async def schedule_user_jobs(job_queue, chat_id, user_id):
     
     # 3. Daily Journal (9 PM)
     job_queue.run_daily(
-        send_journal_prompt,
+        background_job(send_journal_prompt),
         time=time(hour=23, minute=30, tzinfo=pytz.timezone('America/New_York')),
         chat_id=chat_id,
         name=f'journal_{user_id}'
@@ -93,7 +111,7 @@ async def schedule_user_jobs(job_queue, chat_id, user_id):
     
     # 4. Shadowing (10 PM)
     job_queue.run_daily(
-        send_shadowing_task,
+        background_job(send_shadowing_task),
         time=time(hour=22, minute=0, tzinfo=pytz.timezone('America/New_York')),
         chat_id=chat_id,
         name=f'shadowing_{user_id}'
@@ -107,30 +125,49 @@ async def restore_jobs(application):
     for user_id in users:
         # Assuming chat_id is same as user_id for private chats
         await schedule_user_jobs(application.job_queue, user_id, user_id)
+    
+    # Nightly batch: precompute tomorrow's Word of the Day for everyone
+    if application.job_queue and not application.job_queue.get_jobs_by_name('wod_precompute'):
+        application.job_queue.run_daily(
+            background_job(run_wod_precompute),
+            time=time(hour=2, minute=0, tzinfo=pytz.timezone('America/New_York')),
+            name='wod_precompute'
+        )
     logger.info(f"Restored jobs for {len(users)} users.")
 
 # --- Job Callbacks ---
 
+async def run_wod_precompute(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        users = await get_all_users()
+        await precompute_word_of_day(users)
+    except Exception as e:
+        logger.error(f"Error precomputing WOD: {e}")
+
 async def send_word_of_day(context: ContextTypes.DEFAULT_TYPE):
-    job = context.job
+    await deliver_word_of_day(context.bot, context.job.chat_id)
+
+async def deliver_word_of_day(bot, chat_id: int, use_queue: bool = True):
+    """Send a Word of the Day; only scheduled delivery takes precomputed candidates."""
     try:
-        wod = await generate_word_of_day()
+        wod = await next_word_of_day(chat_id, use_queue=use_queue)
         msg = f"""☀️ **Word of the Day: {wod['word']}**
 
 **Definition:** {wod['definition']}
 **Chinese:** {wod['chinese']}
 **Example:** _{wod['example']}_"""
         
-        await context.bot.send_message(job.chat_id, text=msg, parse_mode='Markdown')
+        await bot.send_message(chat_id, text=msg, parse_mode='Markdown')
         
         # Audio
         audio_path = await text_to_speech(wod['word'])
         with open(audio_path, 'rb') as audio:
-            await context.bot.send_voice(job.chat_id, audio)
+            await bot.send_voice(chat_id, audio)
         os.remove(audio_path)
         
         # Save to flashcards automatically
-        await save_flashcard(wod, job.chat_id) # Assuming chat_id is user_id
+        await save_flashcard(wod, chat_id) # Assuming chat_id is user_id
+        known_words.add(chat_id, wod['word'])
         
     except Exception as e:
         logger.error(f"Error sending WOD: {e}")
@@ -168,7 +205,9 @@ async def send_journal_prompt(context: ContextTypes.DEFAULT_TYPE):
 async def send_shadowing_task(context: ContextTypes.DEFAULT_TYPE):
     job = context.job
     try:
-        task = await generate_shadowing_task()
+        # Target the sounds and words this user keeps getting wrong
+        targets = await get_weak_targets(job.chat_id)
+        task = await generate_shadowing_task(targets)
         user_shadowing_tasks[job.chat_id] = task
         
         msg = f"""🎤 **Shadowing Practice**
@@ -181,8 +220,12 @@ async def send_shadowing_task(context: ContextTypes.DEFAULT_TYPE):
         
         await context.bot.send_message(job.chat_id, text=msg, parse_mode='Markdown')
         
-        # Reference Audio
-        audio_path = await create_reference_audio(task['sentence'])
+        # Reference Audio (text-only if every TTS engine is down)
+        try:
+            audio_path = await create_reference_audio(task['sentence'])
+        except Exception as e:
+            logger.warning(f"Reference audio unavailable, sent text only: {e}")
+            return
         with open(audio_path, 'rb') as audio:
             await context.bot.send_voice(job.chat_id, audio)
         os.remove(audio_path)
@@ -210,12 +253,8 @@ async def wod_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     # Ensure user is saved
     await save_user(update.effective_user.id)
-    
-    class DummyJob:
-        def __init__(self, chat_id):
-            self.chat_id = chat_id
-    context.job = DummyJob(chat_id)
-    await send_word_of_day(context)
+    # Generated live: the precomputed queue is kept for the 09:00 delivery
+    await deliver_word_of_day(context.bot, chat_id, use_queue=False)
 
 async def journal_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -273,6 +312,11 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     chat_id = update.effective_chat.id
+
+    if query.data.startswith("search:"):
+        await send_search_page(chat_id, int(query.data.split(":")[1]), query)
+        return
+
     state = user_review_states.get(chat_id)
     
     if not state:
@@ -296,6 +340,10 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # --- Handlers ---
 
+async def tag_ai_context(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs before every handler: AI calls for updates are interactive, per user."""
+    set_ai_context(INTERACTIVE, update.effective_user.id if update.effective_user else None)
+
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle text messages (Journal vs Word Lookup)."""
     chat_id = update.effective_chat.id
@@ -317,6 +365,13 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             logger.info(f"Journal saved for user {user_id}: {result}")
             await update.message.reply_text("✅ Journal entry saved!")
+            
+            # Fold the new entry into the rolling summaries in the background
+            context.application.create_task(refresh_insights_background(user_id))
+            
+            # Queue the entry for embedding (related memories)
+            for row in result or []:
+                memory_index.add_entry(row['id'], user_id, row.get('entry'))
         except Exception as e:
             logger.error(f"Error saving journal: {e}")
             await update.message.reply_text(f"❌ Error saving journal: {e}")
@@ -337,7 +392,12 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def process_word_lookup(update: Update, word: str):
     await update.message.reply_text(f"🔍 Looking up '{word}'...")
     try:
-        result = await lookup_word(word)
+        # Common words are answered from the local index; misses go to Gemini
+        dictionary = get_dictionary()
+        result = dictionary.lookup(word)
+        if not result:
+            result = await lookup_word(word)
+            dictionary.remember(result)
         
         response = f"""📚 **{result['word'].upper()}**
 
@@ -354,6 +414,7 @@ async def process_word_lookup(update: Update, word: str):
         
         # Save
         save_result = await save_flashcard(result, update.effective_user.id)
+        known_words.add(update.effective_user.id, result['word'])
         if save_result and save_result.get('status') == 'skipped':
              await update.message.reply_text("⚠️ Word already in flashcards!")
         else:
@@ -365,22 +426,41 @@ async def process_word_lookup(update: Update, word: str):
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    voice_file = await update.message.voice.get_file()
-    file_path = f"voice_{chat_id}.ogg"
-    await voice_file.download_to_drive(file_path)
+    voice = update.message.voice
+    shadowing = chat_id in user_shadowing_tasks
+    expected = user_shadowing_tasks[chat_id].get('sentence') if shadowing else None
     
-    await update.message.reply_text("🎧 Analyzing...")
+    # Forwarded / re-sent voice notes keep their file_unique_id: skip the download
+    file_key = cache_key('file', voice.file_unique_id, expected)
+    feedback = analysis_cache.get(file_key)
+    file_path = f"voice_{chat_id}_{voice.file_unique_id}.ogg"
     
     try:
-        if chat_id in user_shadowing_tasks:
+        if feedback is None:
+            voice_file = await voice.get_file()
+            await voice_file.download_to_drive(file_path)
+            
+            await update.message.reply_text("🎧 Analyzing...")
+            
+            # Same recording uploaded again: skip the model call
+            content_key = cache_key('sha256', hash_file(file_path), expected)
+            feedback = analysis_cache.get(content_key)
+            if feedback is None:
+                feedback = await analyze_audio_file(file_path, expected)
+                if not feedback.get('error') and not feedback.get('degraded'):
+                    analysis_cache.put(content_key, feedback)
+                    # Only fresh analyses count towards score history
+                    await record_attempt(update.effective_user.id, feedback['text'])
+            if not feedback.get('error') and not feedback.get('degraded'):
+                analysis_cache.put(file_key, feedback)
+        
+        if shadowing:
             # Shadowing feedback
-            feedback = await analyze_audio_file(file_path)
             # Use None for parse_mode to avoid markdown errors with raw text
             await update.message.reply_text(f"✅ **Shadowing Feedback**\n\n{feedback['text']}", parse_mode=None)
             del user_shadowing_tasks[chat_id]
         else:
             # General analysis
-            feedback = await analyze_audio_file(file_path)
             # Use None for parse_mode to avoid markdown errors with raw text
             await update.message.reply_text(f"🎙️ **Voice Analysis**\n\n{feedback['text']}", parse_mode=None)
             
@@ -392,8 +472,13 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def memory_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Retrieve a random past journal entry."""
+    """Retrieve a random past journal entry, or entries related to a topic."""
     user_id = update.effective_user.id
+    topic = ' '.join(context.args).strip() if context.args else ''
+    if topic:
+        await related_memories(update, user_id, topic)
+        return
+    
     entry = await get_random_journal(user_id)
     
     if not entry:
@@ -407,13 +492,170 @@ async def memory_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 {entry_text}
 
-*Use /memory to see another random entry!*"""
+*Use /memory to see another random entry, /memory <topic> for related ones, or /memory today for entries like your latest!*"""
     
     await update.message.reply_text(msg, parse_mode='Markdown')
 
+async def related_memories(update: Update, user_id: int, topic: str):
+    """Top related past entries from the local embedding index."""
+    try:
+        if topic.lower() in ('today', 'similar', 'latest'):
+            _, matches = await memory_index.similar_to_latest(user_id)
+            title = "Memories like your latest entry"
+        else:
+            matches = await memory_index.search(user_id, topic)
+            title = f"Memories about \"{topic}\""
+    except Exception as e:
+        logger.error(f"Related memories error: {e}")
+        await update.message.reply_text("❌ Could not search memories right now.")
+        return
+    
+    entries = await get_journals_by_ids(user_id, [entry_id for entry_id, _ in matches])
+    if not entries:
+        await update.message.reply_text("📝 No related journal entries yet! Use /journal to start writing.")
+        return
+    
+    msg = f"🔗 {title}\n"
+    for entry in entries:
+        msg += f"\n📖 {entry.get('entry_date', 'Unknown date')}\n{entry.get('entry', '')}\n"
+    # Plain text: journal entries may contain Markdown characters
+    await update.message.reply_text(msg, parse_mode=None)
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Full-text search over the user's journal entries."""
+    query_text = ' '.join(context.args).strip() if context.args else ''
+    if not query_text:
+        await update.message.reply_text("Usage: /search <words>\nExample: /search presentation feedback")
+        return
+
+    user_search_states[update.effective_chat.id] = {
+        'query': query_text,
+        'user_id': update.effective_user.id
+    }
+    await send_search_page(update.effective_chat.id, 0, update.message)
+
+async def send_search_page(chat_id, page, target):
+    """Send (or edit, for a callback query) one page of search results."""
+    state = user_search_states.get(chat_id)
+    is_callback = hasattr(target, 'edit_message_text')
+    if not state:
+        await target.edit_message_text("Search expired. Run /search again.")
+        return
+    query_text = state['query']
+
+    try:
+        results = await search_journals(state['user_id'], query_text, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE)
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        results = None
+    if results is None:
+        msg = "❌ Search is unavailable right now."
+    elif not results:
+        msg = f"🔎 No journal entries match \"{html.escape(query_text)}\"."
+    else:
+        total = results[0]['total']
+        first = page * SEARCH_PAGE_SIZE + 1
+        msg = f"🔎 <b>\"{html.escape(query_text)}\"</b> ({first}-{first + len(results) - 1} of {total})\n"
+        for row in results:
+            msg += f"\n📅 <b>{html.escape(str(row['entry_date']))}</b>\n{row['headline']}\n"
+
+    buttons = []
+    if results and page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"search:{page - 1}"))
+    if results and (page + 1) * SEARCH_PAGE_SIZE < results[0]['total']:
+        buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"search:{page + 1}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+
+    if is_callback:
+        await target.edit_message_text(msg, parse_mode='HTML', reply_markup=reply_markup)
+    else:
+        await target.reply_text(msg, parse_mode='HTML', reply_markup=reply_markup)
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Export flashcards (CSV or Anki) or journal entries (CSV) as a file."""
+    user_id = update.effective_user.id
+    args = [arg.lower() for arg in context.args] if context.args else []
+
+    if 'journal' in args:
+        exporter, label = export_journals_csv, "journal entries"
+    elif 'anki' in args:
+        exporter, label = export_flashcards_anki, "flashcards"
+    else:
+        exporter, label = export_flashcards_csv, "flashcards"
+
+    await update.message.reply_text(f"📦 Exporting your {label}...")
+    filepath = None
+    try:
+        filepath, count = await exporter(user_id)
+        if count == 0:
+            await update.message.reply_text(f"Nothing to export yet — you have no {label}.")
+            return
+        with open(filepath, 'rb') as f:
+            await update.message.reply_document(f, caption=f"✅ {count} {label}")
+    except Exception as e:
+        logger.error(f"Export error: {e}")
+        await update.message.reply_text("❌ Export failed. Please try again later.")
+    finally:
+        if filepath and os.path.exists(filepath):
+            os.remove(filepath)
+
+async def import_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_import_states.add(update.effective_chat.id)
+    await update.message.reply_text(
+        "📥 Send me a CSV file with columns: word, definition, chinese, example\n"
+        "(Only 'word' is required. Words you already have are skipped.)"
+    )
+
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Receive a flashcard CSV after /import."""
+    chat_id = update.effective_chat.id
+    if chat_id not in user_import_states:
+        await update.message.reply_text("To import flashcards, use /import first.")
+        return
+    user_import_states.discard(chat_id)
+
+    document = update.message.document
+    file_path = f"/tmp/import_{chat_id}_{document.file_unique_id}.csv"
+    try:
+        tg_file = await document.get_file()
+        await tg_file.download_to_drive(file_path)
+        await update.message.reply_text("📥 Importing...")
+        result = await import_flashcards_csv(file_path, update.effective_user.id)
+        await update.message.reply_text(f"✅ Imported {result['inserted']} flashcards ({result['skipped']} skipped).")
+    except Exception as e:
+        logger.error(f"Import error: {e}")
+        await update.message.reply_text(f"❌ Import failed: {e}")
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+async def insights_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show rolling weekly and monthly journal summaries."""
+    user_id = update.effective_user.id
+    await update.message.reply_text("🔮 Gathering your insights...")
+    try:
+        insights = await refresh_insights(user_id)
+    except Exception as e:
+        logger.error(f"Insights error: {e}")
+        await update.message.reply_text("❌ Could not load insights right now.")
+        return
+    
+    if not any(insight['entry_count'] for insight in insights.values()):
+        await update.message.reply_text("📝 No journal entries this month yet! Use /journal to start writing.")
+        return
+    
+    msg = ""
+    for period, title in (('week', "This Week"), ('month', "This Month")):
+        insight = insights[period]
+        if insight['entry_count']:
+            msg += f"🔮 {title} ({insight['entry_count']} entries since {insight['period_start']})\n\n{insight['summary']}\n\n"
+    
+    # Plain text: the summary is model output
+    await update.message.reply_text(msg.strip(), parse_mode=None)
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
-        "**Commands:**\n/shadowing - Practice\n/wod - Word of Day\n/journal - Journal\n/memory - Random journal\n/review - Flashcards\n/stats - Progress\n/help - Info",
+        "**Commands:**\n/shadowing - Practice\n/wod - Word of Day\n/journal - Journal\n/memory - Random or related journal\n/search - Search journal\n/insights - Journal insights\n/export - Export (add 'anki' or 'journal')\n/import - Import CSV\n/review - Flashcards\n/stats - Progress\n/help - Info",
         parse_mode='Markdown'
     )
 
@@ -433,14 +675,37 @@ async def debug_jobs_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    cards = await get_flashcards(user_id, limit=5)
-    await update.message.reply_text(f"📊 You have **{len(cards) if cards else 0}** flashcards saved.", parse_mode='Markdown')
+    await known_words.ensure_loaded(user_id)
+    msg = f"📊 You have **{known_words.size(user_id)}** flashcards saved."
+    
+    try:
+        trend = await get_pronunciation_trend(user_id)
+    except Exception as e:
+        logger.error(f"Error loading pronunciation stats: {e}")
+        trend = None
+    
+    if trend and trend['attempts']:
+        this_avg, this_count = trend['this_week']
+        last_avg, _ = trend['last_week']
+        msg += f"\n\n🎤 **Pronunciation** ({trend['attempts']} attempts)"
+        if this_avg is not None:
+            change = f" ({this_avg - last_avg:+d} vs last week)" if last_avg is not None else ""
+            msg += f"\nThis week: **{this_avg}**/100 over {this_count} attempts{change}"
+        elif last_avg is not None:
+            msg += f"\nLast week: **{last_avg}**/100"
+        if trend['sounds']:
+            msg += f"\nWeak sounds: {', '.join(trend['sounds'])}"
+        if trend['words']:
+            msg += f"\nPractice words: {', '.join(trend['words'])}"
+    
+    await update.message.reply_text(msg, parse_mode='Markdown')
 
 # Initialize Application
 token = os.getenv('TELEGRAM_BOT_TOKEN')
 if token:
     application = Application.builder().token(token).build()
     
+    application.add_handler(TypeHandler(Update, tag_ai_context), group=-1)
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("shadowing", shadowing_command))
     application.add_handler(CommandHandler("wod", wod_command))
@@ -448,10 +713,15 @@ if token:
     application.add_handler(CommandHandler("review", review_command))
     application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("memory", memory_command))
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("insights", insights_command))
+    application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CommandHandler("import", import_command))
     application.add_handler(CommandHandler("debug_jobs", debug_jobs_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CallbackQueryHandler(button_callback))
     application.add_handler(MessageHandler(filters.VOICE, handle_voice))
+    application.add_handler(MessageHandler(filters.Document.ALL, handle_document))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
 else:
     application = None
@@ -469,3 +739,14 @@ async def process_telegram_update(data: dict):
         
     update = Update.de_json(data, application.bot)
     await application.process_update(update)
+
+if __name__ == '__main__':
+    # Standalone: run with long polling (no web server / webhook needed)
+    from polling import run_polling
+    if not application:
+        print("❌ TELEGRAM_BOT_TOKEN is not set")
+    else:
+        try:
+            asyncio.run(run_polling(application, restore_jobs))
+        except KeyboardInterrupt:
+            pass
@@ -6,14 +6,23 @@ from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 from telegram import Update
 from bot import application, restore_jobs
+from polling import PollingRunner
+from services.gemini_ai import lookup_flight
+from services.tts import tts_flight
+from services.resilience import dependency_stats
+from services.scheduler import ai_scheduler
+from services.analysis_cache import analysis_cache
 
 load_dotenv()
 
 app = FastAPI(title="English Coach Bot", version="2.0.0")
+polling_runner = None
+polling_task = None
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize bot and restore schedules on startup."""
+    global polling_runner, polling_task
     if not application._initialized:
         await application.initialize()
         await application.start()
@@ -25,7 +34,9 @@ async def startup_event():
         await application.bot.set_webhook(url=webhook_url)
         print(f"✅ Webhook set to: {webhook_url}")
     else:
-        print("⚠️ No WEBHOOK_URL found. Polling mode or manual webhook required.")
+        polling_runner = PollingRunner(application)
+        polling_task = asyncio.create_task(polling_runner.run())
+        print("✅ No WEBHOOK_URL found. Receiving updates with long polling.")
 
     # Restore jobs for all users
     await restore_jobs(application)
@@ -34,6 +45,13 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean shutdown."""
+    if polling_task:
+        # Stops polling, finishes in-flight updates and confirms them
+        polling_task.cancel()
+        try:
+            await polling_task
+        except asyncio.CancelledError:
+            pass
     await application.stop()
     await application.shutdown()
 
@@ -42,6 +60,19 @@ async def health_check():
     """Health check endpoint for UptimeRobot."""
     return JSONResponse(content={"status": "ok", "message": "English Coach is running 🚀"})
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for monitoring."""
+    return JSONResponse(content={
+        "singleflight": {
+            flight.name: flight.stats() for flight in (lookup_flight, tts_flight)
+        },
+        "dependencies": dependency_stats(),
+        "ai_scheduler": ai_scheduler.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "polling": polling_runner.stats() if polling_runner else None
+    })
+
 @app.post("/telegram-webhook")
 async def telegram_webhook(request: Request):
     """Webhook endpoint for Telegram updates."""
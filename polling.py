@@ -0,0 +1,222 @@
+"""Long-polling runner for self-hosted single-node deployments.
+
+Fetches updates with getUpdates long polling and processes them concurrently
+through the same Application (and handlers) as the webhook. Updates from the
+same chat are processed one at a time and in order.
+
+The offset sent back to Telegram moves past every update as soon as it is
+dispatched, so one slow update never holds back fetching for other chats.
+Updates that were fetched but not finished are kept in a small local journal
+and replayed on the next start, so a crash still never loses an update.
+
+Run standalone with `python polling.py` (or `python bot.py`), or let main.py
+start it when no WEBHOOK_URL is configured.
+"""
+from collections import deque
+import asyncio
+import json
+import logging
+import os
+
+from telegram import Update
+from telegram.error import NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_COMPACT_LINES = 1000  # Rewrite the journal once it has this many lines
+
+class UpdateJournal:
+    """Append-only JSON lines record of updates that are fetched but not finished."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.open = {}  # update_id -> update dict
+        self._lines = 0
+        self._file = None
+
+    def load(self) -> list:
+        """Updates left unfinished by the previous run, oldest first."""
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written line
+                    if 'done' in record:
+                        self.open.pop(record['done'], None)
+                    else:
+                        self.open[record['update']['update_id']] = record['update']
+        self._compact()
+        return [self.open[update_id] for update_id in sorted(self.open)]
+
+    def add(self, update: Update):
+        data = update.to_dict()
+        self.open[update.update_id] = data
+        self._write({'update': data})
+
+    def done(self, update_id: int):
+        if self.open.pop(update_id, None) is None:
+            return
+        if self._lines >= JOURNAL_COMPACT_LINES:
+            self._compact()
+        else:
+            self._write({'done': update_id})
+
+    def _write(self, record: dict):
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._lines += 1
+        except OSError as e:
+            logger.warning(f"Could not write update journal: {e}")
+
+    def _compact(self):
+        """Rewrite the journal with only the updates that are still open."""
+        try:
+            if self._file:
+                self._file.close()
+                self._file = None
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for data in self.open.values():
+                    f.write(json.dumps({'update': data}, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+            self._lines = len(self.open)
+        except OSError as e:
+            logger.warning(f"Could not compact update journal: {e}")
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class PollingRunner:
+    def __init__(self, application, timeout: int = None, concurrency: int = None, journal_path: str = None):
+        self.application = application
+        self.timeout = timeout or int(os.getenv('POLLING_TIMEOUT', 50))
+        self._semaphore = asyncio.Semaphore(concurrency or int(os.getenv('POLLING_CONCURRENCY', 32)))
+        self.journal = UpdateJournal(journal_path or os.getenv('POLLING_JOURNAL_PATH', 'data/polling_journal.jsonl'))
+        self._queues = {}      # chat key -> deque of updates waiting for that chat
+        self._workers = {}     # chat key -> worker task
+        self._pending = set()  # update_ids fetched but not finished
+        self._next_offset = None
+        self.processed = 0
+        self.replayed = 0
+
+    async def _process(self, update: Update):
+        async with self._semaphore:
+            try:
+                await self.application.process_update(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}")
+        self._pending.discard(update.update_id)
+        self.journal.done(update.update_id)
+        self.processed += 1
+
+    async def _chat_worker(self, key):
+        queue = self._queues[key]
+        try:
+            while queue:
+                await self._process(queue.popleft())
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+
+    def _dispatch(self, update: Update):
+        chat = update.effective_chat
+        key = chat.id if chat else f'update-{update.update_id}'
+        self._pending.add(update.update_id)
+        self._queues.setdefault(key, deque()).append(update)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._chat_worker(key))
+
+    def _replay(self, bot):
+        """Dispatch updates the previous run fetched but did not finish."""
+        for data in self.journal.load():
+            update = Update.de_json(data, bot)
+            self._dispatch(update)
+            self._next_offset = update.update_id + 1
+            self.replayed += 1
+        if self.replayed:
+            logger.info(f"Replaying {self.replayed} unfinished updates from the journal")
+
+    async def run(self):
+        bot = self.application.bot
+        # getUpdates does not work while a webhook is set
+        await bot.delete_webhook()
+        self._replay(bot)
+        logger.info(f"Polling for updates (timeout={self.timeout}s)")
+
+        try:
+            while True:
+                try:
+                    updates = await bot.get_updates(
+                        offset=self._next_offset,
+                        timeout=self.timeout,
+                        read_timeout=self.timeout + 10,
+                        allowed_updates=Update.ALL_TYPES,
+                    )
+                except RetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except NetworkError as e:
+                    logger.warning(f"getUpdates failed, retrying: {e}")
+                    await asyncio.sleep(3)
+                    continue
+
+                for update in updates:
+                    if self._next_offset is not None and update.update_id < self._next_offset:
+                        continue
+                    # Journaled before the next getUpdates confirms it to Telegram
+                    self.journal.add(update)
+                    self._next_offset = update.update_id + 1
+                    self._dispatch(update)
+        finally:
+            await self._drain()
+
+    async def _drain(self):
+        """Finish in-flight updates and confirm them to Telegram."""
+        if self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self.journal.close()
+        if self._next_offset is not None:
+            try:
+                await self.application.bot.get_updates(offset=self._next_offset, timeout=0, limit=1)
+            except Exception as e:
+                logger.warning(f"Could not confirm final offset: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'processed': self.processed,
+            'in_flight': len(self._pending),
+            'replayed': self.replayed,
+            'active_chats': len(self._workers),
+            'next_offset': self._next_offset,
+        }
+
+async def run_polling(application, restore_jobs):
+    """Start the bot in polling mode and run until interrupted."""
+    await application.initialize()
+    await application.start()
+    await restore_jobs(application)
+    try:
+        await PollingRunner(application).run()
+    finally:
+        await application.stop()
+        await application.shutdown()
+
+if __name__ == '__main__':
+    from bot import application, restore_jobs
+
+    if not application:
+        print("❌ TELEGRAM_BOT_TOKEN is not set")
+    else:
+        try:
+            asyncio.run(run_polling(application, restore_jobs))
+        except KeyboardInterrupt:
+            pass
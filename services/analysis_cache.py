@@ -0,0 +1,112 @@
+"""Content-addressed cache for voice analysis results.
+
+Results are keyed by Telegram's file_unique_id (stable across forwards and
+re-sends, so a hit skips the download) and by a hash of the audio bytes (so
+the same recording uploaded again skips the model call), each combined with
+the expected sentence in shadowing mode.
+
+The cache is an LRU bounded by entry count and total size. Set
+ANALYSIS_CACHE_PATH to persist it as an append-only JSON lines file that is
+compacted when it grows too large.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+def cache_key(kind: str, value: str, expected: str = None) -> str:
+    return hashlib.sha256(f"{kind}\x1f{value}\x1f{expected or ''}".encode('utf-8')).hexdigest()
+
+def hash_file(path: str, chunk_size: int = 1 << 16) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    def __init__(self, max_entries: int, max_bytes: int, path: str = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._log_lines = 0
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def get(self, key: str):
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(item[0])
+
+    def put(self, key: str, value: dict):
+        self._store(key, value)
+        if self.path:
+            self._append(key, value)
+
+    def _store(self, key: str, value: dict):
+        size = len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line
+                self._store(record['key'], record['value'])
+                self._log_lines += 1
+
+    def _append(self, key: str, value: dict):
+        try:
+            # Rewrite the log once it holds mostly evicted or replaced entries
+            if self._log_lines >= 2 * self.max_entries:
+                self._compact()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'key': key, 'value': value}, ensure_ascii=False) + '\n')
+            self._log_lines += 1
+        except OSError as e:
+            logger.warning(f"Could not persist analysis cache: {e}")
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, (value, _) in self._entries.items():
+                f.write(json.dumps({'key': key, 'value': value}, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv('ANALYSIS_CACHE_ENTRIES', 1000)),
+    max_bytes=int(float(os.getenv('ANALYSIS_CACHE_MB', 8)) * 1024 * 1024),
+    path=os.getenv('ANALYSIS_CACHE_PATH'),
+)
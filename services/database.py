@@ -29,6 +29,46 @@ async def get_flashcards(user_id: int, limit: int = 20):
     result = supabase.table('flashcards').select('*').eq('user_id', str(user_id)).order('created_at', desc=True).limit(limit).execute()
     return result.data
 
+async def _iter_user_rows(table: str, user_id: int, columns: str, page_size: int):
+    """Stream a user's rows page by page using keyset pagination on id."""
+    last_id = None
+    while True:
+        query = supabase.table(table).select(columns).eq('user_id', str(user_id))
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        result = query.order('id').limit(page_size).execute()
+        rows = result.data or []
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+def iter_flashcards(user_id: int, columns: str = 'id, word, definition, chinese, example', page_size: int = 500):
+    """Iterate over all of a user's flashcards without loading them at once."""
+    return _iter_user_rows('flashcards', user_id, columns, page_size)
+
+def iter_journals(user_id: int, columns: str = 'id, entry_date, entry', page_size: int = 500):
+    """Iterate over all of a user's journal entries without loading them at once."""
+    return _iter_user_rows('journal_entries', user_id, columns, page_size)
+
+async def bulk_save_flashcards(cards: list, user_id: int):
+    """Insert a batch of flashcards, skipping words the user already has."""
+    words = list({card['word'] for card in cards})
+    existing = supabase.table('flashcards').select('word').eq('user_id', str(user_id)).in_('word', words).execute()
+    seen = {row['word'] for row in existing.data or []}
+
+    data = []
+    for card in cards:
+        if card['word'] in seen:
+            continue
+        seen.add(card['word'])
+        data.append({**card, 'user_id': str(user_id)})
+
+    if data:
+        supabase.table('flashcards').insert(data).execute()
+    return {'inserted': len(data), 'skipped': len(cards) - len(data)}
+
 async def save_journal(entry_data: dict, user_id: int):
     """Save journal entry."""
     data = {
@@ -39,6 +79,14 @@ async def save_journal(entry_data: dict, user_id: int):
     return result.data
 
 
+async def get_journals_by_ids(user_id: int, entry_ids: list):
+    """Fetch specific journal entries, in the order of `entry_ids`."""
+    if not entry_ids:
+        return []
+    result = supabase.table('journal_entries').select('id, entry_date, entry').eq('user_id', str(user_id)).in_('id', entry_ids).execute()
+    by_id = {row['id']: row for row in result.data or []}
+    return [by_id[entry_id] for entry_id in entry_ids if entry_id in by_id]
+
 async def get_random_journal(user_id: int):
     """Get a random journal entry for the user."""
     result = supabase.table('journal_entries').select('*').eq('user_id', str(user_id)).execute()
@@ -47,6 +95,55 @@ async def get_random_journal(user_id: int):
         return random.choice(result.data)
     return None
 
+async def search_journals(user_id: int, query: str, limit: int = 5, offset: int = 0):
+    """Full-text search journal entries (see JOURNAL_SEARCH.sql)."""
+    result = supabase.rpc('search_journal_entries', {
+        'p_user_id': str(user_id),
+        'p_query': query,
+        'p_limit': limit,
+        'p_offset': offset
+    }).execute()
+    return result.data or []
+
+async def get_journals_since(user_id: int, after_id: int, since_date: str, limit: int = 50):
+    """Journal entries newer than `after_id` dated on/after `since_date`, oldest first."""
+    result = supabase.table('journal_entries').select('id, entry_date, entry').eq('user_id', str(user_id)).gt('id', after_id).gte('entry_date', since_date).order('id').limit(limit).execute()
+    return result.data or []
+
+async def get_journal_insight(user_id: int, period: str, period_start: str):
+    """Stored rolling summary for one period, or None."""
+    result = supabase.table('journal_insights').select('*').eq('user_id', str(user_id)).eq('period', period).eq('period_start', period_start).execute()
+    return result.data[0] if result.data else None
+
+async def save_journal_insight(insight: dict, user_id: int):
+    """Create or update a rolling summary."""
+    data = {
+        **insight,
+        'user_id': str(user_id)
+    }
+    data.pop('id', None)
+    result = supabase.table('journal_insights').upsert(data, on_conflict='user_id,period,period_start').execute()
+    return result.data
+
+async def save_pronunciation_score(score: int, words: list, user_id: int):
+    """Append one attempt to the user's score history."""
+    data = {'score': score, 'words': words, 'user_id': str(user_id)}
+    result = supabase.table('pronunciation_scores').insert(data).execute()
+    return result.data
+
+async def get_pronunciation_profile(user_id: int):
+    """Pre-aggregated pronunciation stats and weakness index, or None."""
+    result = supabase.table('pronunciation_profile').select('*').eq('user_id', str(user_id)).execute()
+    return result.data[0] if result.data else None
+
+async def save_pronunciation_profile(profile: dict, user_id: int):
+    data = {
+        **profile,
+        'user_id': str(user_id)
+    }
+    result = supabase.table('pronunciation_profile').upsert(data, on_conflict='user_id').execute()
+    return result.data
+
 async def save_mission_completion(mission_data: dict, user_id: int):
     """Save completed mission."""
     data = {
@@ -56,6 +153,31 @@ async def save_mission_completion(mission_data: dict, user_id: int):
     result = supabase.table('missions').insert(data).execute()
     return result.data
 
+async def count_wod_candidates(user_id: int) -> int:
+    """Number of precomputed Word of the Day candidates waiting for the user."""
+    result = supabase.table('wod_candidates').select('id', count='exact').eq('user_id', str(user_id)).execute()
+    return result.count or 0
+
+async def save_wod_candidates(candidates: list, user_id: int):
+    """Queue precomputed Word of the Day candidates for the user."""
+    if not candidates:
+        return []
+    data = [{**candidate, 'user_id': str(user_id)} for candidate in candidates]
+    result = supabase.table('wod_candidates').insert(data).execute()
+    return result.data
+
+async def pop_wod_candidate(user_id: int):
+    """Take the oldest queued Word of the Day candidate, or None.
+
+    Select and delete happen in one statement (see WOD_CANDIDATES.sql), so
+    concurrent callers never get the same candidate.
+    """
+    result = supabase.rpc('pop_wod_candidate', {'p_user_id': str(user_id)}).execute()
+    if not result.data:
+        return None
+    candidate = result.data[0]
+    return {key: candidate.get(key) or '' for key in ('word', 'definition', 'chinese', 'example')}
+
 async def save_user(user_id: int):
     """Save user to track active users for schedule restoration."""
     try:
@@ -0,0 +1,271 @@
+"""Local vocabulary index that answers common lookups without calling Gemini.
+
+The index is built offline into a compact binary file that is memory-mapped on
+startup, so loading is instant and memory use stays flat:
+
+    magic 'ECDX' | u32 version | u32 count
+    count x u32 record offsets (sorted by word)
+    records: u32 length + UTF-8 'word \\x1f definition \\x1f chinese \\x1f example'
+
+Words missed by the index are looked up with Gemini and appended to an overlay
+file, which the next offline build folds into the index.
+
+Build it with:
+    python -m services.dictionary build
+"""
+import csv
+import json
+import mmap
+import os
+import struct
+import sys
+
+INDEX_PATH = os.getenv('DICTIONARY_INDEX_PATH', 'data/dictionary.idx')
+OVERLAY_PATH = os.getenv('DICTIONARY_OVERLAY_PATH', 'data/dictionary_overlay.jsonl')
+VOCABULARY_CSV = 'data/business_vocabulary.csv'
+
+MAGIC = b'ECDX'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+OFFSET = struct.Struct('<I')
+SEP = '\x1f'
+FIELDS = ('word', 'definition', 'chinese', 'example')
+
+def normalize(word: str) -> str:
+    return ' '.join(word.split()).lower()
+
+MIN_LEMMA_LENGTH = 5  # Shorter bases (the, new, fee, ear...) make too many false matches
+VOWELS = 'aeiou'
+
+def lemma_candidates(word: str) -> list:
+    """Possible base forms of an inflected word, most likely first."""
+    candidates = []
+
+    def add(candidate):
+        if len(candidate) >= 2 and candidate not in candidates:
+            candidates.append(candidate)
+
+    if word.endswith('ies'):
+        add(word[:-3] + 'y')
+    if word.endswith('ied'):
+        add(word[:-3] + 'y')
+    if word.endswith('ing'):
+        stem = word[:-3]
+        add(stem + 'e')
+        add(stem)
+        if len(stem) > 2 and stem[-1] == stem[-2]:
+            add(stem[:-1])
+    if word.endswith('ed'):
+        stem = word[:-2]
+        add(word[:-1])
+        add(stem)
+        if len(stem) > 2 and stem[-1] == stem[-2]:
+            add(stem[:-1])
+    if word.endswith('es'):
+        add(word[:-2])
+    if word.endswith('s') and not word.endswith('ss'):
+        add(word[:-1])
+    if word.endswith('ily'):
+        add(word[:-3] + 'y')
+    if word.endswith('ly'):
+        add(word[:-2])
+        add(word[:-2] + 'le')
+    return candidates
+
+def inflections(base: str) -> set:
+    """Regular inflected forms of a base word (plural/3rd person, -ing, -ed, -ly)."""
+    forms = set()
+    consonant_y = base.endswith('y') and len(base) > 1 and base[-2] not in VOWELS
+    # Short final syllable such as commit -> committed (target -> targeted is also kept)
+    doubles = (len(base) > 2 and base[-1] not in VOWELS + 'wxy'
+               and base[-2] in VOWELS and base[-3] not in VOWELS)
+
+    if consonant_y:
+        forms.add(base[:-1] + 'ies')
+    elif base.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')):
+        forms.add(base + 'es')
+    else:
+        forms.add(base + 's')
+
+    if base.endswith('ie'):
+        forms.add(base[:-2] + 'ying')
+    elif base.endswith('e') and not base.endswith(('ee', 'ye', 'oe')):
+        forms.add(base[:-1] + 'ing')
+    else:
+        forms.add(base + 'ing')
+    if doubles:
+        forms.add(base + base[-1] + 'ing')
+
+    if base.endswith('e'):
+        forms.add(base + 'd')
+    elif consonant_y:
+        forms.add(base[:-1] + 'ied')
+    else:
+        forms.add(base + 'ed')
+    if doubles:
+        forms.add(base + base[-1] + 'ed')
+
+    if consonant_y:
+        forms.add(base[:-1] + 'ily')
+    elif base.endswith('le'):
+        forms.add(base[:-1] + 'y')
+    else:
+        forms.add(base + 'ly')
+    return forms
+
+class DictionaryIndex:
+    """Read-only, memory-mapped view of a built index file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported dictionary index: {path}")
+        self._offsets_start = HEADER.size
+        self._records_start = self._offsets_start + self.count * OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, i: int) -> list:
+        (offset,) = OFFSET.unpack_from(self._mm, self._offsets_start + i * OFFSET.size)
+        start = self._records_start + offset
+        (length,) = OFFSET.unpack_from(self._mm, start)
+        return self._mm[start + OFFSET.size:start + OFFSET.size + length].decode('utf-8').split(SEP)
+
+    def _key(self, i: int) -> str:
+        return self._record(i)[0]
+
+    def _bisect(self, key: str) -> int:
+        """First position whose word is >= key."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, word: str):
+        """Exact lookup of a normalized word."""
+        i = self._bisect(word)
+        if i < self.count:
+            record = self._record(i)
+            if record[0] == word:
+                return dict(zip(FIELDS, record))
+        return None
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+def _load_overlay(path: str) -> dict:
+    entries = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line
+                entries[normalize(entry['word'])] = entry
+    return entries
+
+class Dictionary:
+    """Memory-mapped index plus the overlay of words learned since the last build."""
+
+    def __init__(self, index_path: str = INDEX_PATH, overlay_path: str = OVERLAY_PATH):
+        self.index = DictionaryIndex(index_path) if os.path.exists(index_path) else None
+        self.overlay_path = overlay_path
+        self.overlay = _load_overlay(overlay_path)
+
+    def _get(self, word: str):
+        if word in self.overlay:
+            return dict(self.overlay[word])
+        if self.index:
+            return self.index.get(word)
+        return None
+
+    def lookup(self, word: str):
+        """Find a word by exact match, then by its base form.
+
+        A base form is only used when regularly inflecting it gives back the
+        word asked for, and it is long enough not to be a coincidence
+        ('leveraging' -> 'leverage', but not 'thing' -> 'the'). Anything else
+        is left to Gemini, whose answer is then remembered as an exact entry.
+        """
+        key = normalize(word)
+        entry = self._get(key)
+        if entry:
+            return entry
+
+        for candidate in lemma_candidates(key):
+            if len(candidate) < MIN_LEMMA_LENGTH or key not in inflections(candidate):
+                continue
+            entry = self._get(candidate)
+            if entry:
+                return entry
+        return None
+
+    def remember(self, entry: dict):
+        """Write a Gemini result back so the next lookup is answered locally."""
+        if not entry.get('word') or not entry.get('definition'):
+            return
+        key = normalize(entry['word'])
+        if key in self.overlay:
+            return
+        record = {field: entry.get(field, '') for field in FIELDS}
+        record['word'] = key
+        self.overlay[key] = record
+        try:
+            os.makedirs(os.path.dirname(self.overlay_path) or '.', exist_ok=True)
+            with open(self.overlay_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"⚠️ Could not write dictionary overlay: {e}")
+
+def build_index(out_path: str, csv_path: str = VOCABULARY_CSV, overlay_path: str = OVERLAY_PATH) -> int:
+    """Build the binary index from the curated CSV plus past Gemini results."""
+    entries = _load_overlay(overlay_path)
+    with open(csv_path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            # Curated entries take precedence over model output
+            entries[normalize(row['word'])] = row
+
+    offsets = []
+    records = bytearray()
+    for word in sorted(entries):
+        entry = entries[word]
+        fields = [word] + [' '.join(entry.get(field, '').split()) for field in FIELDS[1:]]
+        data = SEP.join(fields).encode('utf-8')
+        offsets.append(len(records))
+        records += OFFSET.pack(len(data)) + data
+
+    tmp_path = out_path + '.tmp'
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(offsets)))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.write(records)
+    os.replace(tmp_path, out_path)
+    return len(offsets)
+
+_dictionary = None
+
+def get_dictionary() -> Dictionary:
+    """Shared dictionary, opened on first use."""
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = Dictionary()
+    return _dictionary
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Usage: python -m services.dictionary build [out_path]")
+        sys.exit(1)
+    out = sys.argv[2] if len(sys.argv) > 2 else INDEX_PATH
+    count = build_index(out)
+    print(f"✅ Built dictionary index with {count} words: {out}")
@@ -0,0 +1,89 @@
+"""Streaming export/import of flashcards and journal entries.
+
+Rows are written to the file as pages arrive from the database, and imports
+are inserted in batches, so memory stays constant however many cards a user has.
+"""
+import csv
+import html
+import uuid
+
+from services.database import iter_flashcards, iter_journals, bulk_save_flashcards
+from services.known_words import known_words
+
+FLASHCARD_FIELDS = ['word', 'definition', 'chinese', 'example']
+JOURNAL_FIELDS = ['entry_date', 'entry']
+
+async def export_flashcards_csv(user_id: int) -> tuple:
+    """Write all flashcards to a CSV file. Returns (path, row count)."""
+    filepath = f'/tmp/flashcards_{user_id}_{uuid.uuid4().hex[:8]}.csv'
+    count = 0
+    # utf-8-sig so Excel shows the Chinese column correctly
+    with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=FLASHCARD_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        async for card in iter_flashcards(user_id):
+            writer.writerow(card)
+            count += 1
+    return filepath, count
+
+async def export_flashcards_anki(user_id: int) -> tuple:
+    """Write all flashcards as an Anki text import file. Returns (path, row count).
+
+    Uses Anki's file headers so File > Import picks the Basic note type
+    and tab separator without any setup.
+    """
+    filepath = f'/tmp/flashcards_{user_id}_{uuid.uuid4().hex[:8]}.txt'
+    count = 0
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        f.write("#separator:tab\n#html:true\n#notetype:Basic\n#columns:Front\tBack\n#tags:english-coach\n")
+        writer = csv.writer(f, delimiter='\t', quoting=csv.QUOTE_MINIMAL)
+        async for card in iter_flashcards(user_id):
+            back = '<br>'.join(filter(None, [
+                html.escape(card.get('definition') or ''),
+                html.escape(card.get('chinese') or ''),
+                f"<i>{html.escape(card['example'])}</i>" if card.get('example') else ''
+            ]))
+            writer.writerow([html.escape(card['word']), back])
+            count += 1
+    return filepath, count
+
+async def export_journals_csv(user_id: int) -> tuple:
+    """Write all journal entries to a CSV file. Returns (path, row count)."""
+    filepath = f'/tmp/journal_{user_id}_{uuid.uuid4().hex[:8]}.csv'
+    count = 0
+    with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=JOURNAL_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        async for entry in iter_journals(user_id):
+            writer.writerow(entry)
+            count += 1
+    return filepath, count
+
+async def import_flashcards_csv(filepath: str, user_id: int, batch_size: int = 200) -> dict:
+    """Import flashcards from a CSV with a 'word' column, in batches."""
+    totals = {'inserted': 0, 'skipped': 0}
+    batch = []
+
+    async def flush():
+        result = await bulk_save_flashcards(batch, user_id)
+        totals['inserted'] += result['inserted']
+        totals['skipped'] += result['skipped']
+        for card in batch:
+            known_words.add(user_id, card['word'])
+        batch.clear()
+
+    with open(filepath, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'word' not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ValueError("CSV needs a header row with at least a 'word' column")
+        for row in reader:
+            row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items() if key}
+            if not row.get('word'):
+                totals['skipped'] += 1
+                continue
+            batch.append({field: row.get(field, '') for field in FLASHCARD_FIELDS})
+            if len(batch) >= batch_size:
+                await flush()
+    if batch:
+        await flush()
+    return totals
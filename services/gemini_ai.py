@@ -1,7 +1,13 @@
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from services.singleflight import SingleFlight, normalize_key
+from services.resilience import Dependency, CircuitOpenError
+from services.scheduler import ai_scheduler
+
 load_dotenv()
 
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
@@ -12,8 +18,49 @@ model_fast = genai.GenerativeModel('gemini-2.5-flash')
 # High-quality model for complex tasks (voice analysis, shadowing)
 model = genai.GenerativeModel('gemini-3-pro-preview')
 
+# Breaker + hedging for the pro model, which is slow and often degraded.
+# 400s (e.g. an unsupported audio file) are the request's fault, not the model's.
+# A hedge is a second request, so it needs its own scheduler slot.
+gemini_pro = Dependency(
+    'gemini-pro',
+    timeout=float(os.getenv('GEMINI_PRO_TIMEOUT', 90)),
+    hedge=True,
+    client_errors=(google_exceptions.BadRequest,),
+    hedge_slot=ai_scheduler.try_acquire,
+)
+
+async def generate_pro(contents, operation: str = 'text'):
+    """Call the pro model through the AI scheduler and its circuit breaker (with hedging).
+
+    `operation` selects the latency window used for hedging, so audio analysis
+    is not hedged against the much shorter text prompts.
+    """
+    async with ai_scheduler.slot():
+        return await gemini_pro.call(lambda: model.generate_content_async(contents), operation=operation)
+
+async def generate_fast(contents):
+    """Call the fast model through the AI scheduler."""
+    async with ai_scheduler.slot():
+        return await model_fast.generate_content_async(contents)
+
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'models/text-embedding-004')
+
+async def embed_texts(texts: list, task_type: str = 'retrieval_document') -> list:
+    """Embed a batch of texts in one request. Returns one vector per text."""
+    async with ai_scheduler.slot():
+        result = await asyncio.to_thread(genai.embed_content, model=EMBEDDING_MODEL, content=texts, task_type=task_type)
+    return result['embedding']
+
+# Coalesces identical lookups (e.g. a whole class looking up the same word)
+lookup_flight = SingleFlight('lookup_word')
+
 async def lookup_word(word: str) -> dict:
     """Look up a word and get definition, Chinese translation, and example."""
+    result = await lookup_flight.do(normalize_key(word), _lookup_word, word)
+    # Each caller gets its own copy of the shared result
+    return dict(result)
+
+async def _lookup_word(word: str) -> dict:
     prompt = f"""Define the word '{word}' in 1-2 concise sentences for MBA students.
     Provide the Chinese translation.
     Give a practical business/MBA example sentence.
@@ -24,7 +71,7 @@ async def lookup_word(word: str) -> dict:
     Example: [example sentence]
     """
     
-    response = model_fast.generate_content(prompt)
+    response = await generate_fast(prompt)
     text = response.text
     
     # Parse response
@@ -47,30 +94,22 @@ async def lookup_word(word: str) -> dict:
         'example': example
     }
 
-async def analyze_pronunciation(text: str, expected: str) -> dict:
-    """Analyze pronunciation quality from transcribed text (legacy)."""
-    prompt = f"""You are a pronunciation coach. Compare what the student said vs what they should have said.
+async def analyze_audio_file(audio_path: str, expected: str = None) -> dict:
+    """Analyze audio file directly using Gemini multimodal.
 
-Expected text: "{expected}"
-What they said: "{text}"
-
-Provide:
-1. Overall score (0-100)
-2. Specific words pronounced incorrectly
-3. Helpful tips
-
-Keep feedback encouraging and concise!"""
-    
-    response = model.generate_content(prompt)
-    return {'feedback': response.text, 'score': 85}
-
-async def analyze_audio_file(audio_path: str) -> dict:
-    """Analyze audio file directly using Gemini multimodal."""
+    In shadowing mode pass the `expected` sentence the student was reading.
+    """
     try:
+        # Fail fast, without uploading, while the model is unhealthy
+        if gemini_pro.breaker.is_open():
+            raise CircuitOpenError("gemini-pro is temporarily unavailable")
+        
         # Upload file to Gemini
-        myfile = genai.upload_file(audio_path)
+        myfile = await asyncio.to_thread(genai.upload_file, audio_path)
         
-        prompt = """Listen to this audio.
+        # Shadowing: compare against the sentence the student was practicing
+        target = f'\n        The student was trying to say: "{expected}". Compare their attempt against it.' if expected else ''
+        prompt = f"""Listen to this audio.{target}
         1. Transcribe exactly what was said.
         2. Analyze the pronunciation, intonation, and fluency.
         3. Give a score (0-100).
@@ -82,15 +121,18 @@ async def analyze_audio_file(audio_path: str) -> dict:
         Format:
         Transcription: [text]
         Feedback: [detailed feedback]
+        Words to improve: [comma-separated words, or None]
         Score: [number]
         """
         
-        response = model.generate_content([prompt, myfile])
+        response = await generate_pro([prompt, myfile], operation='audio')
         return {'text': response.text}
+    except CircuitOpenError:
+        return {'text': "⚠️ Voice analysis is busy right now. Please try again in a minute.", 'degraded': True}
     except Exception as e:
-        return {'text': f"Error analyzing audio: {str(e)}"}
+        return {'text': f"Error analyzing audio: {str(e)}", 'error': True}
 
-async def generate_word_of_day() -> dict:
+async def generate_word_of_day(exclude: list = None) -> dict:
     """Generate interesting word for the day."""
     from datetime import datetime
     import pytz
@@ -99,6 +141,8 @@ async def generate_word_of_day() -> dict:
     ny_tz = pytz.timezone('America/New_York')
     today = datetime.now(ny_tz).strftime('%Y-%m-%d')
     
+    exclude_line = f"The student already knows these words, do NOT use any of them: {', '.join(exclude)}" if exclude else ""
+    
     # Use date as seed in prompt to ensure consistency within the day
     prompt = f"""Generate ONE interesting business/MBA vocabulary word for international students.
     
@@ -106,6 +150,7 @@ async def generate_word_of_day() -> dict:
     
     Important: Generate a DIFFERENT word each day based on the date. Use the date to select a unique word.
     Do NOT repeat words from previous days.
+    {exclude_line}
     
     Format:
     Word: [word]
@@ -115,7 +160,7 @@ async def generate_word_of_day() -> dict:
     
     Make it relevant and useful!"""
     
-    response = model_fast.generate_content(prompt)
+    response = await generate_fast(prompt)
     text = response.text
     
     # Parse response (handle markdown formatting)
@@ -144,6 +189,73 @@ async def generate_word_of_day() -> dict:
         'example': example
     }
 
+async def generate_word_candidates(students: dict, count: int = 3) -> dict:
+    """Generate Word of the Day candidates for several students in one request.
+
+    `students` maps a short label to words that student already knows;
+    returns label -> list of word dicts.
+    """
+    lines = []
+    for label, known in students.items():
+        lines.append(f"Student {label} already knows: {', '.join(known) if known else '(nothing yet)'}")
+    student_list = '\n'.join(lines)
+    
+    prompt = f"""Generate {count} interesting business/MBA vocabulary words for EACH student below.
+    Each student must get words they do NOT already know. Use different words for different students when possible.
+    
+    {student_list}
+    
+    Format each word EXACTLY as (one block per word, no markdown):
+    Student: [label]
+    Word: [word]
+    Definition: [definition]
+    Chinese: [chinese]
+    Example: [example]
+    """
+    
+    response = await generate_fast(prompt)
+    
+    results = {label: [] for label in students}
+    current = None
+    for line in response.text.split('\n'):
+        clean_line = line.replace('**', '').replace('*', '').strip()
+        if clean_line.startswith('Student:'):
+            label = clean_line.replace('Student:', '').strip()
+            current = {'word': '', 'definition': '', 'chinese': '', 'example': ''}
+            if label in results:
+                results[label].append(current)
+            else:
+                current = None
+        elif current is not None:
+            for field in ('Word', 'Definition', 'Chinese', 'Example'):
+                if clean_line.startswith(f'{field}:'):
+                    current[field.lower()] = clean_line.replace(f'{field}:', '').strip()
+    
+    return {label: [w for w in words if w['word']] for label, words in results.items()}
+
+async def fold_journal_summary(summary: str, entries: list, period: str) -> str:
+    """Update a rolling journal summary with new entries only."""
+    new_entries = '\n\n'.join(f"[{entry['entry_date']}]\n{entry['entry']}" for entry in entries)
+    
+    prompt = f"""You maintain a running summary of a student's daily journal for this {period}.
+    Each entry answers: 3 things done well, 3 things to do better, 3 plans for tomorrow.
+    
+    Current summary (may be empty):
+    {summary or '(none yet)'}
+    
+    New entries to fold in:
+    {new_entries}
+    
+    Rewrite the summary to include the new entries. Keep it under 150 words.
+    Output PLAIN TEXT ONLY (no markdown), in EXACTLY these sections:
+    Wins: [recurring wins and achievements]
+    Improve: [recurring improvement themes]
+    Follow-through: [which earlier plans were actually done later, and which keep slipping]
+    """
+    
+    response = await generate_fast(prompt)
+    return response.text.strip()
+
 async def generate_journal_prompt() -> str:
     """Return the standard daily reflection prompt."""
     return """
@@ -161,7 +273,7 @@ async def generate_weekly_mission() -> dict:
     Task: [Specific task, e.g., "Order coffee using 3 adjectives"]
     Tip: [One helpful tip]
     """
-    response = model.generate_content(prompt)
+    response = await generate_pro(prompt)
     text = response.text
     
     title = ""
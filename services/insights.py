@@ -0,0 +1,64 @@
+"""Incremental journal insights.
+
+Each user has a rolling summary per week and per month. Refreshing only sends
+entries newer than the last one already folded into the summary, so the cost of
+a refresh depends on how much was written since, not on the whole history.
+"""
+from datetime import datetime, timedelta
+import logging
+
+from services.database import get_journals_since, get_journal_insight, save_journal_insight
+from services.gemini_ai import fold_journal_summary
+from services.scheduler import set_ai_context, BACKGROUND
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+FOLD_BATCH = 10  # Entries sent per model call when catching up
+
+def period_starts(today) -> dict:
+    return {
+        'week': today - timedelta(days=today.weekday()),
+        'month': today.replace(day=1),
+    }
+
+# One refresh per user at a time, so no entry is folded in twice
+_refresh_flight = SingleFlight('journal_insights')
+
+async def refresh_insights(user_id: int) -> dict:
+    """Fold new journal entries into the user's summaries. Returns period -> insight."""
+    return await _refresh_flight.do(user_id, _refresh_insights, user_id)
+
+async def _refresh_insights(user_id: int) -> dict:
+    insights = {}
+    # Same clock as the entry_date written by handle_text
+    for period, start in period_starts(datetime.now().date()).items():
+        start = start.isoformat()
+        insight = await get_journal_insight(user_id, period, start) or {
+            'period': period,
+            'period_start': start,
+            'summary': '',
+            'last_entry_id': 0,
+            'entry_count': 0,
+        }
+
+        while True:
+            entries = await get_journals_since(user_id, insight['last_entry_id'], start, limit=FOLD_BATCH)
+            if not entries:
+                break
+            insight['summary'] = await fold_journal_summary(insight['summary'], entries, period)
+            insight['last_entry_id'] = entries[-1]['id']
+            insight['entry_count'] += len(entries)
+            insight['updated_at'] = datetime.now().isoformat()
+            await save_journal_insight(insight, user_id)
+
+        insights[period] = insight
+    return insights
+
+async def refresh_insights_background(user_id: int):
+    """Fire-and-forget refresh after a journal save (uses the background AI lane)."""
+    set_ai_context(BACKGROUND, user_id)
+    try:
+        await refresh_insights(user_id)
+    except Exception as e:
+        logger.error(f"Error updating journal insights for {user_id}: {e}")
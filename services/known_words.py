@@ -0,0 +1,57 @@
+"""Per-user index of words already in the user's flashcards.
+
+Each user's words are stored as a sorted array of 64-bit hashes (8 bytes per
+word), loaded once from the database and then kept up to date on every save.
+"""
+from array import array
+import bisect
+import hashlib
+
+from services.database import iter_flashcards
+from services.singleflight import SingleFlight, normalize_key
+
+def word_hash(word: str) -> int:
+    digest = hashlib.blake2b(normalize_key(word).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+class KnownWordIndex:
+    def __init__(self):
+        self._users = {}  # user_id -> sorted array('Q') of word hashes
+        self._loaded = set()
+        self._load_flight = SingleFlight('known_words_load')
+
+    async def _load(self, user_id: int):
+        hashes = array('Q')
+        async for card in iter_flashcards(user_id, columns='id, word'):
+            hashes.append(word_hash(card['word']))
+        # Words added while loading are kept
+        pending = self._users.get(user_id)
+        if pending:
+            hashes.extend(pending)
+        self._users[user_id] = array('Q', sorted(set(hashes)))
+        self._loaded.add(user_id)
+
+    async def ensure_loaded(self, user_id: int):
+        if user_id not in self._loaded:
+            await self._load_flight.do(user_id, self._load, user_id)
+
+    def add(self, user_id: int, word: str):
+        """Record a newly saved word (call after every flashcard save)."""
+        hashes = self._users.setdefault(user_id, array('Q'))
+        h = word_hash(word)
+        i = bisect.bisect_left(hashes, h)
+        if i == len(hashes) or hashes[i] != h:
+            hashes.insert(i, h)
+
+    def contains(self, user_id: int, word: str) -> bool:
+        hashes = self._users.get(user_id)
+        if not hashes:
+            return False
+        h = word_hash(word)
+        i = bisect.bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def size(self, user_id: int) -> int:
+        return len(self._users.get(user_id, ()))
+
+known_words = KnownWordIndex()
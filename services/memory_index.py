@@ -0,0 +1,206 @@
+"""Local embedding index over journal entries for "related memories".
+
+Vectors are L2-normalized float32 rows appended to a raw file and
+memory-mapped for search; a parallel int64 file holds (entry_id, user_id)
+per row. Both files are append-only, so adding entries is incremental and
+an entry that is already in the index is never embedded again.
+
+New entries are queued when journals are saved and embedded in batches;
+older entries are backfilled the first time a user searches.
+"""
+from collections import OrderedDict
+import asyncio
+import json
+import logging
+import os
+
+import numpy as np
+
+from services.database import iter_journals
+from services.gemini_ai import embed_texts, EMBEDDING_MODEL
+from services.scheduler import set_ai_context, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv('MEMORY_INDEX_DIR', 'data/memory_index')
+EMBED_BATCH = 32      # Texts per embedding request
+FLUSH_DELAY = 5       # Seconds to wait for more saves before embedding
+QUERY_CACHE_SIZE = 256
+
+class MemoryIndex:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.meta_path = os.path.join(directory, 'meta.i64')
+        self.info_path = os.path.join(directory, 'index.json')
+        self.dim = None
+        self.count = 0
+        self._vectors = None
+        self._user_rows = {}     # user_id -> list of row numbers
+        self._entry_rows = {}    # entry_id -> row number
+        self._row_entries = []   # row number -> entry_id
+        self._backfilled = set()
+        self._pending = OrderedDict()  # entry_id -> (user_id, text)
+        self._query_cache = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+        self._tasks = set()  # Strong references so running flushes are not garbage-collected
+        self._load()
+
+    # --- Storage ---
+
+    def _load(self):
+        if not os.path.exists(self.info_path):
+            return
+        with open(self.info_path) as f:
+            info = json.load(f)
+        if info.get('model') != EMBEDDING_MODEL:
+            logger.warning("Embedding model changed; memory index will be rebuilt")
+            for path in (self.vectors_path, self.meta_path, self.info_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self.dim = info['dim']
+        meta_rows = os.path.getsize(self.meta_path) // 16 if os.path.exists(self.meta_path) else 0
+        meta = np.fromfile(self.meta_path, dtype=np.int64, count=2 * meta_rows).reshape(-1, 2) if meta_rows else np.empty((0, 2), np.int64)
+        vector_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        # Rows are only valid once both files have them (a crash may leave one short)
+        self.count = min(len(meta), vector_rows)
+        for row, (entry_id, user_id) in enumerate(meta[:self.count]):
+            self._entry_rows[int(entry_id)] = row
+            self._row_entries.append(int(entry_id))
+            self._user_rows.setdefault(int(user_id), []).append(row)
+        self._remap()
+
+    def _remap(self):
+        if self.count:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+
+    def _append(self, rows: list):
+        """Persist (entry_id, user_id, vector) rows."""
+        vectors = np.asarray([vector for _, _, vector in rows], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.info_path, 'w') as f:
+                json.dump({'dim': self.dim, 'model': EMBEDDING_MODEL}, f)
+        # Truncate any partial tail left by a crash before appending
+        for path, row_bytes in ((self.vectors_path, 4 * self.dim), (self.meta_path, 16)):
+            if os.path.exists(path) and os.path.getsize(path) != self.count * row_bytes:
+                with open(path, 'r+b') as f:
+                    f.truncate(self.count * row_bytes)
+        with open(self.vectors_path, 'ab') as f:
+            f.write(vectors.tobytes())
+        with open(self.meta_path, 'ab') as f:
+            f.write(np.asarray([(e, u) for e, u, _ in rows], dtype=np.int64).tobytes())
+
+        for entry_id, user_id, _ in rows:
+            self._entry_rows[entry_id] = self.count
+            self._row_entries.append(entry_id)
+            self._user_rows.setdefault(user_id, []).append(self.count)
+            self.count += 1
+        self._remap()
+
+    # --- Embedding ---
+
+    def add_entry(self, entry_id: int, user_id: int, text: str):
+        """Queue a newly saved entry; it is embedded with the next batch."""
+        if entry_id in self._entry_rows or not text:
+            return
+        self._pending[entry_id] = (user_id, text)
+        if len(self._pending) >= EMBED_BATCH:
+            self._start_flush(0)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._start_flush(FLUSH_DELAY)
+
+    def _start_flush(self, delay: float) -> asyncio.Task:
+        task = asyncio.create_task(self._background_flush(delay))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _background_flush(self, delay: float):
+        # Runs in its own task, so this only affects the flush itself
+        set_ai_context(BACKGROUND)
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self):
+        """Embed all queued entries in batches."""
+        async with self._lock:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < EMBED_BATCH:
+                    entry_id, (user_id, text) = self._pending.popitem(last=False)
+                    if entry_id not in self._entry_rows:
+                        batch.append((entry_id, user_id, text))
+                if not batch:
+                    continue
+                try:
+                    vectors = await embed_texts([text for _, _, text in batch])
+                except Exception as e:
+                    logger.error(f"Error embedding journal entries: {e}")
+                    # Keep them queued for the next flush
+                    for entry_id, user_id, text in batch:
+                        self._pending[entry_id] = (user_id, text)
+                    return
+                self._append([(entry_id, user_id, vector) for (entry_id, user_id, _), vector in zip(batch, vectors)])
+
+    async def backfill(self, user_id: int):
+        """Embed the user's entries that are not indexed yet.
+
+        Scans every entry rather than only those newer than the newest indexed
+        one: entries indexed live by add_entry can be newer than older ones
+        that were never embedded (written before this feature, or still queued
+        when the process stopped). Runs once per user per process; later
+        entries arrive through add_entry.
+        """
+        if user_id in self._backfilled:
+            return
+        async for entry in iter_journals(user_id, columns='id, entry'):
+            self.add_entry(entry['id'], user_id, entry.get('entry'))
+        await self.flush()
+        if not self._pending:
+            self._backfilled.add(user_id)
+
+    async def _embed_query(self, text: str) -> np.ndarray:
+        key = ' '.join(text.split()).lower()
+        if key in self._query_cache:
+            self._query_cache.move_to_end(key)
+            return self._query_cache[key]
+        vector = np.asarray((await embed_texts([text], task_type='retrieval_query'))[0], dtype=np.float32)
+        vector /= np.linalg.norm(vector) + 1e-12
+        self._query_cache[key] = vector
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return vector
+
+    # --- Search ---
+
+    def _top_k(self, user_id: int, query: np.ndarray, k: int, exclude: set = ()) -> list:
+        rows = [row for row in self._user_rows.get(user_id, []) if row not in exclude]
+        if not rows:
+            return []
+        rows = np.asarray(rows)
+        scores = self._vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._row_entries[int(rows[i])], float(scores[i])) for i in top]
+
+    async def search(self, user_id: int, text: str, k: int = 3) -> list:
+        """Entries most related to `text`: list of (entry_id, similarity)."""
+        await self.backfill(user_id)
+        return self._top_k(user_id, await self._embed_query(text), k)
+
+    async def similar_to_latest(self, user_id: int, k: int = 3) -> tuple:
+        """Entries most related to the user's latest entry: (latest_id, [(entry_id, similarity)])."""
+        await self.backfill(user_id)
+        rows = self._user_rows.get(user_id)
+        if not rows:
+            return None, []
+        latest_row = max(rows, key=lambda row: self._row_entries[row])
+        return self._row_entries[latest_row], self._top_k(user_id, np.asarray(self._vectors[latest_row]), k, exclude={latest_row})
+
+memory_index = MemoryIndex(INDEX_DIR)
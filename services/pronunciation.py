@@ -0,0 +1,129 @@
+"""Pronunciation history and per-user weakness index.
+
+Every analyzed voice attempt is parsed for its score and the words the model
+flagged. The score is appended to the user's history, and a small profile row
+is updated in place: daily aggregates (so /stats never recomputes from raw
+history) and a weakness index of exponentially decayed weights per word and
+per sound, which steers shadowing sentence generation.
+"""
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import re
+
+from services.database import save_pronunciation_score, get_pronunciation_profile, save_pronunciation_profile
+
+logger = logging.getLogger(__name__)
+
+DECAY = 0.85          # Per attempt: old weaknesses fade as the student improves
+MIN_WEIGHT = 0.2      # Entries below this are dropped to keep the index small
+DAILY_DAYS = 60       # Days of daily aggregates kept in the profile
+
+# Spelling patterns for sounds that are commonly hard for learners. Kept
+# specific on purpose: a pattern matching almost every word would dominate.
+SOUNDS = {
+    'th': re.compile(r'th'),
+    'v/w': re.compile(r'v|\bw'),
+    'r': re.compile(r'\br|[bcdfgkpt]r'),
+    'l': re.compile(r'[bcfgkps]l|l\b'),
+    'ng': re.compile(r'ng\b'),
+    'sh/ch': re.compile(r'sh|ch|tion|sion'),
+    'z': re.compile(r'z|(?<=[aeiou])s(?=[aeiou])'),
+    'final clusters': re.compile(r'[^aeiouy\s]{2}\b'),
+}
+
+SCORE_RE = re.compile(r'score\W*(\d{1,3})', re.IGNORECASE)
+WORDS_RE = re.compile(r'words to improve\W*(.+)', re.IGNORECASE)
+
+def parse_analysis(text: str) -> dict:
+    """Extract the 0-100 score and flagged words from an analysis reply."""
+    score = None
+    # Drop the "(0-100)" range from headings like "Overall Score (0-100): 78"
+    for match in SCORE_RE.finditer(re.sub(r'\(\s*0\s*-\s*100\s*\)', '', text)):
+        value = int(match.group(1))
+        if 0 <= value <= 100:
+            score = value  # The Score: line comes last in the format
+    words = []
+    match = WORDS_RE.search(text)
+    if match:
+        for word in re.split(r'[,;/]', match.group(1)):
+            word = re.sub(r"[^a-zA-Z'\- ]", '', word).strip().lower()
+            if word and word not in ('none', 'n/a') and len(word.split()) <= 2:
+                words.append(word)
+    return {'score': score, 'words': words[:10]}
+
+def sounds_in(word: str) -> set:
+    return {sound for sound, pattern in SOUNDS.items() if pattern.search(word)}
+
+def update_profile(profile: dict, score: int, words: list, today: str) -> dict:
+    """Fold one attempt into the pre-aggregated profile."""
+    daily = profile.setdefault('daily', {})
+    attempts, total = daily.get(today, [0, 0])
+    daily[today] = [attempts + 1, total + score]
+    for day in sorted(daily)[:-DAILY_DAYS]:
+        del daily[day]
+
+    weakness = {key: weight * DECAY for key, weight in profile.get('weakness', {}).items()}
+    for word in words:
+        weakness[f'word:{word}'] = weakness.get(f'word:{word}', 0) + 1
+        for sound in sounds_in(word):
+            weakness[f'sound:{sound}'] = weakness.get(f'sound:{sound}', 0) + 1
+    profile['weakness'] = {key: round(w, 3) for key, w in weakness.items() if w >= MIN_WEIGHT}
+    profile['attempts'] = profile.get('attempts', 0) + 1
+    profile['updated_at'] = datetime.now().isoformat()
+    return profile
+
+_profiles = {}  # user_id -> profile (write-through cache)
+_locks = {}
+
+async def _load_profile(user_id: int) -> dict:
+    if user_id not in _profiles:
+        _profiles[user_id] = await get_pronunciation_profile(user_id) or {'attempts': 0, 'daily': {}, 'weakness': {}}
+    return _profiles[user_id]
+
+async def record_attempt(user_id: int, analysis_text: str):
+    """Parse an analysis reply and store its score. Returns the parsed result."""
+    parsed = parse_analysis(analysis_text)
+    if parsed['score'] is None:
+        return parsed
+    try:
+        await save_pronunciation_score(parsed['score'], parsed['words'], user_id)
+        async with _locks.setdefault(user_id, asyncio.Lock()):
+            profile = await _load_profile(user_id)
+            update_profile(profile, parsed['score'], parsed['words'], datetime.now().strftime('%Y-%m-%d'))
+            await save_pronunciation_profile(profile, user_id)
+    except Exception as e:
+        logger.error(f"Error recording pronunciation for {user_id}: {e}")
+    return parsed
+
+async def get_weak_targets(user_id: int, limit: int = 3) -> dict:
+    """Weakest sounds and words, for targeting the next shadowing sentence."""
+    try:
+        profile = await _load_profile(user_id)
+    except Exception as e:
+        logger.error(f"Error loading pronunciation profile for {user_id}: {e}")
+        return {'sounds': [], 'words': []}
+    ranked = sorted(profile.get('weakness', {}).items(), key=lambda item: item[1], reverse=True)
+    return {
+        'sounds': [key.split(':', 1)[1] for key, _ in ranked if key.startswith('sound:')][:limit],
+        'words': [key.split(':', 1)[1] for key, _ in ranked if key.startswith('word:')][:limit],
+    }
+
+async def get_pronunciation_trend(user_id: int) -> dict:
+    """Average score this week vs last week, from the daily aggregates."""
+    profile = await _load_profile(user_id)
+    daily = profile.get('daily', {})
+    today = datetime.now().date()
+
+    def average(start: int, end: int):
+        days = [(today - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(start, end)]
+        attempts = sum(daily[d][0] for d in days if d in daily)
+        total = sum(daily[d][1] for d in days if d in daily)
+        return (round(total / attempts), attempts) if attempts else (None, 0)
+
+    return {
+        'attempts': profile.get('attempts', 0),
+        'this_week': average(0, 7),
+        'last_week': average(7, 14),
+        **await get_weak_targets(user_id),
+    }
@@ -0,0 +1,202 @@
+"""Tail-latency protection for external dependencies (Gemini, edge-tts).
+
+Each dependency gets a circuit breaker that fails fast while the backend is
+unhealthy, and optionally hedging: if the first attempt is slower than the
+recent latency percentile, a second identical attempt is started and whichever
+finishes first wins (the other is cancelled).
+
+Latency is tracked per operation (e.g. short text prompts vs audio analysis on
+the same model), so a slow kind of call is only hedged against its own history.
+Errors caused by the request itself (`client_errors`, such as an unsupported
+audio file) say nothing about the backend and do not count towards the breaker.
+"""
+from collections import deque
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', 95))
+HEDGE_MIN_SAMPLES = 20
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (no side effects)."""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            # Let a single probe through to test the backend
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    """Rolling window of successful call durations."""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float):
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def _no_slot():
+    pass
+
+async def _holding(factory, release):
+    try:
+        return await factory()
+    finally:
+        release()
+
+async def hedged(factory, delay: float, on_hedge=None, acquire_slot=None):
+    """Run `await factory()`, starting a second attempt if the first takes longer than `delay`.
+
+    `acquire_slot` is called before hedging and must return a release callback
+    (held for the second attempt's lifetime) or None to skip the hedge.
+    """
+    pending = {asyncio.ensure_future(factory())}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        release = acquire_slot() if acquire_slot else _no_slot
+        if release is None:
+            # No spare capacity: a hedge would exceed the concurrency limit
+            return await next(iter(pending))
+        if on_hedge:
+            on_hedge()
+        pending.add(asyncio.ensure_future(_holding(factory, release)))
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Cancel the loser (or everything, if we were cancelled ourselves)
+        for task in pending:
+            task.cancel()
+
+class Dependency:
+    """Circuit breaker + per-operation latency tracking (+ optional hedging) for one backend."""
+
+    def __init__(self, name: str, timeout: float = None, hedge: bool = False,
+                 failure_threshold: int = 5, reset_timeout: float = 30, client_errors: tuple = (),
+                 hedge_slot=None):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        # Callable returning a release callback or None (see hedged)
+        self.hedge_slot = hedge_slot
+        self.client_errors = client_errors
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.latency = {}  # operation -> LatencyTracker
+        self.hedges = 0
+        self.client_failures = 0
+        dependencies[name] = self
+
+    async def call(self, factory, timeout: float = None, operation: str = 'default'):
+        """Call `await factory()` through the breaker. Raises CircuitOpenError when open."""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is temporarily unavailable")
+
+        latency = self.latency.setdefault(operation, LatencyTracker())
+        delay = latency.percentile(HEDGE_PERCENTILE) if self.hedge else None
+        if delay is not None:
+            attempt = hedged(factory, delay, on_hedge=self._count_hedge, acquire_slot=self.hedge_slot)
+        else:
+            attempt = factory()
+
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(attempt, timeout=timeout or self.timeout)
+        except asyncio.CancelledError:
+            self.breaker._probing = False
+            raise
+        except self.client_errors:
+            # The backend answered; the request itself was bad
+            self.client_failures += 1
+            self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        latency.record(time.monotonic() - start)
+        self.breaker.record_success()
+        return result
+
+    def _count_hedge(self):
+        self.hedges += 1
+
+    def stats(self) -> dict:
+        def seconds(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            'state': self.breaker.state,
+            'failures': self.breaker.failures,
+            'client_failures': self.client_failures,
+            'rejected': self.breaker.rejected,
+            'hedged_calls': self.hedges,
+            'latency': {
+                operation: {
+                    'p50_seconds': seconds(tracker.percentile(50)),
+                    'p95_seconds': seconds(tracker.percentile(95)),
+                }
+                for operation, tracker in self.latency.items()
+            },
+        }
+
+dependencies = {}
+
+def dependency_stats() -> dict:
+    """Breaker state and latency of every dependency, for monitoring."""
+    return {name: dep.stats() for name, dep in dependencies.items()}
@@ -0,0 +1,218 @@
+"""Priority scheduling of the shared AI budget (Gemini and TTS calls).
+
+Every AI call takes a slot from one shared pool. Waiting calls are queued in
+two lanes, interactive (a user is waiting for the reply) and background
+(scheduled jobs). Lanes share capacity by weight, users within a lane take
+turns so one heavy user cannot monopolize it, and background work is deferred
+while interactive calls are waiting longer than the latency target. Background
+work never holds more than `background_max` slots, so some capacity is always
+free for a user who starts talking while jobs are running.
+
+The lane and user come from context variables: handlers run as interactive by
+default and scheduled jobs are wrapped with `background_job`. A background task
+can be promoted to interactive when a user starts waiting on its result (see
+SingleFlight), and hedged second attempts only run on a slot that is free.
+"""
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import functools
+import os
+import time
+import weakref
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+current_lane = contextvars.ContextVar('ai_lane', default=INTERACTIVE)
+current_user = contextvars.ContextVar('ai_user', default=None)
+
+class AIScheduler:
+    def __init__(self, capacity: int, weights: dict, interactive_target: float, background_max: int = None):
+        self.capacity = capacity
+        # Slots background work may hold at once; the rest stay free for interactive calls
+        self.background_max = background_max if background_max is not None else max(1, capacity - 2)
+        self.weights = weights
+        self.interactive_target = interactive_target
+        # lane -> user -> deque of (enqueued_at, future)
+        self._queues = {lane: OrderedDict() for lane in weights}
+        self._credit = {lane: 0 for lane in weights}
+        self.active = {lane: 0 for lane in weights}
+        self.granted = {lane: 0 for lane in weights}
+        self.deferred = 0
+        self._wait = {lane: 0.0 for lane in weights}  # EWMA of queue wait, seconds
+        self._promoted = weakref.WeakSet()  # Tasks whose calls are served as interactive
+        self.promotions = 0
+        self.extra_slots = 0
+
+    def _queued(self, lane: str) -> int:
+        return sum(len(waiters) for waiters in self._queues[lane].values())
+
+    def _oldest_wait(self, lane: str) -> float:
+        now = time.monotonic()
+        return max((now - waiters[0][0] for waiters in self._queues[lane].values() if waiters), default=0.0)
+
+    def _interactive_backlogged(self) -> bool:
+        return self._oldest_wait(INTERACTIVE) > self.interactive_target
+
+    def _pick_lane(self):
+        """Smooth weighted round robin over lanes that have waiters."""
+        lanes = [lane for lane, users in self._queues.items() if users]
+        if BACKGROUND in lanes and self.active[BACKGROUND] >= self.background_max:
+            lanes.remove(BACKGROUND)
+        elif BACKGROUND in lanes and self._interactive_backlogged():
+            # Defer background work until interactive latency recovers
+            lanes.remove(BACKGROUND)
+            self.deferred += 1
+        if not lanes:
+            return None
+        total = sum(self.weights[lane] for lane in lanes)
+        for lane in lanes:
+            self._credit[lane] += self.weights[lane]
+        lane = max(lanes, key=lambda l: self._credit[l])
+        self._credit[lane] -= total
+        return lane
+
+    def _dispatch(self):
+        while sum(self.active.values()) < self.capacity:
+            lane = self._pick_lane()
+            if lane is None:
+                return
+            users = self._queues[lane]
+            # Round robin between users: serve the first, then move them to the back
+            user, waiters = next(iter(users.items()))
+            enqueued_at, future, _ = waiters.popleft()
+            if waiters:
+                users.move_to_end(user)
+            else:
+                del users[user]
+            if future.cancelled():
+                continue
+            self._wait[lane] = 0.8 * self._wait[lane] + 0.2 * (time.monotonic() - enqueued_at)
+            self.active[lane] += 1
+            self.granted[lane] += 1
+            # The waiter may have been promoted: tell it which lane to release
+            future.set_result(lane)
+
+    async def acquire(self, lane: str, user) -> str:
+        """Wait for a slot. Returns the lane it was granted in (pass it to release)."""
+        task = asyncio.current_task()
+        if task in self._promoted:
+            lane = INTERACTIVE
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].setdefault(user, deque()).append((time.monotonic(), future, task))
+        self._dispatch()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: give the slot back
+                self.release(future.result())
+            else:
+                self._remove_waiters(lambda waiter: waiter[1] is future)
+            raise
+
+    def _remove_waiters(self, match, lanes=None) -> list:
+        """Take matching waiters out of the queues; returns [(user, waiter)]."""
+        removed = []
+        for lane in lanes or self._queues:
+            users = self._queues[lane]
+            for user, waiters in list(users.items()):
+                if any(match(waiter) for waiter in waiters):
+                    removed += [(user, waiter) for waiter in waiters if match(waiter)]
+                    users[user] = deque(waiter for waiter in waiters if not match(waiter))
+                    if not users[user]:
+                        del users[user]
+        return removed
+
+    def release(self, lane: str):
+        self.active[lane] -= 1
+        self._dispatch()
+
+    def try_acquire(self, lane: str = None):
+        """Take a slot only if one is free right now and nobody is waiting.
+
+        Used for optional extra work such as hedged attempts. Returns a release
+        callback, or None when there is no spare capacity.
+        """
+        lane = lane or current_lane.get()
+        if asyncio.current_task() in self._promoted:
+            lane = INTERACTIVE
+        if any(self._queues.values()) or sum(self.active.values()) >= self.capacity:
+            return None
+        if lane == BACKGROUND and self.active[BACKGROUND] >= self.background_max:
+            return None
+        self.active[lane] += 1
+        self.extra_slots += 1
+        return functools.partial(self.release, lane)
+
+    def promote(self, task):
+        """Serve the task's AI calls as interactive, including ones already queued."""
+        if task is None or task in self._promoted:
+            return
+        self._promoted.add(task)
+        self.promotions += 1
+        for user, waiter in self._remove_waiters(lambda waiter: waiter[2] is task, lanes=[BACKGROUND]):
+            self._queues[INTERACTIVE].setdefault(user, deque()).append(waiter)
+        self._dispatch()
+
+    def demote(self, task):
+        self._promoted.discard(task)
+
+    @asynccontextmanager
+    async def slot(self, lane: str = None, user=None):
+        """Hold one AI slot; lane and user default to the current context."""
+        lane = lane or current_lane.get()
+        user = user if user is not None else current_user.get()
+        lane = await self.acquire(lane, user)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def stats(self) -> dict:
+        return {
+            lane: {
+                'active': self.active[lane],
+                'queued': self._queued(lane),
+                'granted': self.granted[lane],
+                'avg_wait_seconds': round(self._wait[lane], 3),
+                'oldest_wait_seconds': round(self._oldest_wait(lane), 3),
+            }
+            for lane in self._queues
+        } | {
+            'capacity': self.capacity,
+            'background_max': self.background_max,
+            'background_deferrals': self.deferred,
+            'promotions': self.promotions,
+            'extra_slots': self.extra_slots,
+        }
+
+ai_scheduler = AIScheduler(
+    capacity=int(os.getenv('AI_CONCURRENCY', 8)),
+    weights={
+        INTERACTIVE: int(os.getenv('AI_INTERACTIVE_WEIGHT', 4)),
+        BACKGROUND: int(os.getenv('AI_BACKGROUND_WEIGHT', 1)),
+    },
+    interactive_target=float(os.getenv('AI_INTERACTIVE_TARGET', 2.0)),
+    background_max=int(os.getenv('AI_BACKGROUND_MAX')) if os.getenv('AI_BACKGROUND_MAX') else None,
+)
+
+def set_ai_context(lane: str, user=None):
+    """Tag AI calls made from the current task with a lane and user."""
+    current_lane.set(lane)
+    current_user.set(user)
+
+def background_job(callback):
+    """Wrap a JobQueue callback so its AI calls use the background lane."""
+    @functools.wraps(callback)
+    async def wrapper(context):
+        lane_token = current_lane.set(BACKGROUND)
+        user_token = current_user.set(context.job.chat_id if context.job else None)
+        try:
+            return await callback(context)
+        finally:
+            current_lane.reset(lane_token)
+            current_user.reset(user_token)
+    return wrapper
@@ -1,20 +1,58 @@
-import google.generativeai as genai
 import asyncio
-import edge_tts
+import logging
 import os
+import random
 
-async def generate_shadowing_task() -> dict:
-    """Generate fun, varied shadowing task - single sentence."""
-    model = genai.GenerativeModel('gemini-3-pro-preview')
+from services.gemini_ai import generate_pro
+from services.pronunciation import parse_analysis
+from services.tts import text_to_speech
+
+logger = logging.getLogger(__name__)
+
+# Served when Gemini is unavailable: recent generated tasks, then built-ins
+recent_tasks = []
+FALLBACK_TASKS = [
+    {'context': "From The Godfather", 'sentence': "I'm gonna make him an offer he can't refuse."},
+    {'context': "From Forrest Gump", 'sentence': "My mama always said life was like a box of chocolates."},
+    {'context': "Business meeting", 'sentence': "Let's circle back on this after we review the quarterly numbers."},
+    {'context': "Job interview", 'sentence': "I thrive in fast-paced environments where I can learn something new every day."},
+    {'context': "From The Wizard of Oz", 'sentence': "Toto, I've a feeling we're not in Kansas anymore."},
+]
+
+async def generate_shadowing_task(targets: dict = None) -> dict:
+    """Generate fun, varied shadowing task - single sentence.
+
+    `targets` ({'sounds': [...], 'words': [...]}) steers the sentence towards
+    the student's weak spots.
+    """
+    try:
+        task = await _generate_shadowing_task(targets)
+    except Exception as e:
+        # Degraded mode: reuse earlier content instead of failing the job
+        logger.warning(f"Shadowing generation unavailable, serving cached task: {e!r}")
+        return random.choice(recent_tasks or FALLBACK_TASKS)
+    recent_tasks.append(task)
+    del recent_tasks[:-20]
+    return task
+
+async def _generate_shadowing_task(targets: dict = None) -> dict:
+    focus = ""
+    if targets and (targets.get('sounds') or targets.get('words')):
+        focus = "\nThe student struggles with"
+        if targets.get('sounds'):
+            focus += f" these sounds: {', '.join(targets['sounds'])}"
+        if targets.get('words'):
+            focus += f"{';' if targets.get('sounds') else ''} these words: {', '.join(targets['words'])}"
+        focus += ".\nPick a sentence that practices these sounds (use one of the words if it fits naturally).\n"
     
-    prompt = """Generate ONE single sentence for English pronunciation practice.
+    prompt = f"""Generate ONE single sentence for English pronunciation practice.
 
 The sentence should be:
 - Fun and memorable (from movies, TV shows, quotes, or interesting topics)
 - Natural conversational English
 - Good for pronunciation practice
 - 10-15 words max
-
+{focus}
 Format:
 Context: [brief context - movie/topic/source]
 Sentence: [one sentence]
@@ -28,7 +66,7 @@ Sentence: Artificial intelligence is transforming how we work and communicate.
 
 Give me ONE varied, interesting sentence!"""
     
-    response = model.generate_content(prompt)
+    response = await generate_pro(prompt)
     text = response.text
     
     # Parse response
@@ -50,21 +88,12 @@ Give me ONE varied, interesting sentence!"""
         'sentence': sentence
     }
 
-async def create_reference_audio(text: str, filename: str = 'shadowing_reference.mp3') -> str:
-    """Create natural-sounding reference audio using Edge TTS."""
-    filepath = f'/tmp/{filename}'
-    
-    # Use Edge TTS with natural neural voice
-    communicate = edge_tts.Communicate(text, "en-US-JennyNeural")  # Female voice
-    # communicate = edge_tts.Communicate(text, "en-US-GuyNeural")  # Male voice
-    
-    await communicate.save(filepath)
-    return filepath
+async def create_reference_audio(text: str, filename: str = None) -> str:
+    """Create natural-sounding reference audio (neural voice, with engine fallback)."""
+    return await text_to_speech(text, filename, content_type='shadowing')
 
 async def analyze_voice_attempt(original_text: str, user_audio_file: str) -> dict:
     """Analyze pronunciation using Gemini's multimodal capabilities."""
-    model = genai.GenerativeModel('gemini-3-pro-preview')
-    
     # For now, give structured feedback based on the text
     # In future, we can send audio to Gemini for analysis
     
@@ -82,9 +111,9 @@ Provide detailed, actionable feedback:
 
 Be encouraging but specific!"""
     
-    response = model.generate_content(prompt)
+    response = await generate_pro(prompt)
     
     return {
         'feedback': response.text,
-        'score': 85  # Will be replaced with actual analysis
+        'score': parse_analysis(response.text)['score']
     }
@@ -0,0 +1,81 @@
+import asyncio
+
+from services.scheduler import ai_scheduler, current_lane, BACKGROUND, INTERACTIVE
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share the same key into one in-flight call.
+
+    While a call for a key is running, further callers with that key await the
+    same future instead of starting their own, and all of them get the same
+    result or exception. Once the call finishes the key is forgotten, so the
+    next caller starts a fresh call.
+
+    When an interactive caller joins a call started from the background lane,
+    the leader is promoted so the user does not wait at background priority.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}  # key -> (future, leader task, leader lane)
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.promoted = 0
+        self.errors = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """Run `await fn(*args, **kwargs)` once per key among concurrent callers."""
+        self.calls += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            future, leader, lane = inflight
+            self.coalesced += 1
+            if lane == BACKGROUND and current_lane.get() == INTERACTIVE:
+                ai_scheduler.promote(leader)
+                self._inflight[key] = (future, leader, INTERACTIVE)
+                self.promoted += 1
+            # shield() so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        leader = asyncio.current_task()
+        self._inflight[key] = (future, leader, current_lane.get())
+        self.executed += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self.errors += 1
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    # Only the leader was cancelled: waiters get an error, not a
+                    # CancelledError they would mistake for their own
+                    e = RuntimeError(f"{self.name}: shared call was cancelled")
+                future.set_exception(e)
+                # Mark retrieved so an error nobody else waited on is not logged
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.pop(key)[2] != current_lane.get():
+                # Promoted for this call only
+                ai_scheduler.demote(leader)
+
+    def stats(self) -> dict:
+        """Counters for monitoring."""
+        return {
+            'calls': self.calls,
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'promoted': self.promoted,
+            'errors': self.errors,
+            'inflight': len(self._inflight),
+        }
+
+
+def normalize_key(text: str) -> str:
+    """Normalize user text so 'Leverage ' and 'leverage' share one call."""
+    return ' '.join(text.split()).lower()
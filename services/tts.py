@@ -1,9 +1,153 @@
+"""Text-to-speech with pluggable engines.
+
+Engines are tried in order (TTS_ENGINES, default "edge,gtts"); an engine that
+fails, exceeds its timeout, or has an open circuit breaker falls through to
+the next one. Blocking engines run in a bounded thread pool so they never
+stall the event loop. Output is converted to OGG/Opus with ffmpeg when
+available, which is what Telegram's send_voice expects.
+"""
 from gtts import gTTS
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import edge_tts
+import io
+import logging
 import os
+import shutil
+import uuid
+
+from services.singleflight import SingleFlight, normalize_key
+from services.resilience import Dependency, CircuitOpenError
+from services.scheduler import ai_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Voice per content type (edge-tts voice names)
+VOICES = {
+    'word': os.getenv('TTS_VOICE_WORD', 'en-US-JennyNeural'),
+    'shadowing': os.getenv('TTS_VOICE_SHADOWING', 'en-US-JennyNeural'),
+}
+
+OUTPUT_FORMAT = os.getenv('TTS_OUTPUT_FORMAT', 'ogg')  # 'ogg' or 'mp3'
+
+# Bounded pool for blocking synthesis (gTTS)
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('TTS_WORKERS', 4)), thread_name_prefix='tts')
+
+class TTSEngine(ABC):
+    """A speech synthesis backend returning MP3 bytes."""
+    name = 'base'
+    hedge = False
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        # Circuit breaker so a failing engine is skipped instantly; hedges take their own AI slot
+        self.dependency = Dependency(f'tts-{self.name}', timeout=timeout, hedge=self.hedge, hedge_slot=ai_scheduler.try_acquire)
+
+    @abstractmethod
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        ...
+
+class EdgeTTSEngine(TTSEngine):
+    """Microsoft Edge neural voices (natively async)."""
+    name = 'edge'
+    hedge = True
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        communicate = edge_tts.Communicate(text, voice)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk['type'] == 'audio':
+                audio += chunk['data']
+        if not audio:
+            raise RuntimeError("edge-tts returned no audio")
+        return bytes(audio)
+
+class GTTSEngine(TTSEngine):
+    """Google Translate TTS; blocking, so it runs in the worker pool."""
+    name = 'gtts'
+
+    def _synthesize(self, text: str) -> bytes:
+        # Timeout on each HTTP request too: wait_for() gives up on the call, but
+        # only this stops the worker thread, so hung requests cannot fill the pool
+        tts = gTTS(text=text, lang='en', tld=os.getenv('TTS_GTTS_TLD', 'com'), slow=False, timeout=self.timeout)
+        buffer = io.BytesIO()
+        tts.write_to_fp(buffer)
+        return buffer.getvalue()
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, self._synthesize, text)
+
+ENGINE_CLASSES = {
+    'edge': (EdgeTTSEngine, 'TTS_EDGE_TIMEOUT', 10),
+    'gtts': (GTTSEngine, 'TTS_GTTS_TIMEOUT', 15),
+}
+
+def _build_engines() -> list:
+    engines = []
+    for name in os.getenv('TTS_ENGINES', 'edge,gtts').split(','):
+        name = name.strip()
+        if name in ENGINE_CLASSES:
+            cls, timeout_env, default_timeout = ENGINE_CLASSES[name]
+            engines.append(cls(float(os.getenv(timeout_env, default_timeout))))
+    return engines
+
+engines = _build_engines()
+
+async def _to_ogg_opus(mp3: bytes) -> bytes:
+    """Transcode MP3 to OGG/Opus with ffmpeg."""
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', '32k', '-ac', '1', '-f', 'ogg', 'pipe:1',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await process.communicate(mp3)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {err.decode(errors='ignore').strip()}")
+    return out
+
+async def synthesize(text: str, content_type: str = 'word') -> tuple:
+    """Synthesize speech, falling back across engines. Returns (audio bytes, extension)."""
+    voice = VOICES.get(content_type, VOICES['word'])
+    errors = []
+    async with ai_scheduler.slot():
+        for engine in engines:
+            try:
+                mp3 = await engine.dependency.call(lambda: engine.synthesize(text, voice))
+                break
+            except asyncio.TimeoutError:
+                errors.append(f"{engine.name}: timed out after {engine.timeout}s")
+            except CircuitOpenError:
+                errors.append(f"{engine.name}: circuit open")
+            except Exception as e:
+                errors.append(f"{engine.name}: {e}")
+            logger.warning(f"TTS engine {engine.name} failed, trying next: {errors[-1]}")
+        else:
+            raise RuntimeError(f"All TTS engines failed ({'; '.join(errors)})")
+
+    if OUTPUT_FORMAT == 'ogg' and shutil.which('ffmpeg'):
+        try:
+            return await _to_ogg_opus(mp3), 'ogg'
+        except Exception as e:
+            logger.warning(f"OGG conversion failed, sending MP3: {e}")
+    return mp3, 'mp3'
+
+# Coalesces identical synthesis requests that are in flight at the same time
+tts_flight = SingleFlight('text_to_speech')
+
+async def text_to_speech(text: str, filename: str = None, content_type: str = 'word'):
+    """Convert text to speech audio file.
 
-async def text_to_speech(text: str, filename: str = 'pronunciation.mp3'):
-    """Convert text to speech audio file."""
-    tts = gTTS(text=text, lang='en', slow=False)
-    filepath = f'/tmp/{filename}'
-    tts.save(filepath)
+    Each caller gets its own file (callers delete it after sending), while the
+    synthesis itself is shared between concurrent callers with the same text.
+    """
+    key = (content_type, normalize_key(text))
+    audio, ext = await tts_flight.do(key, synthesize, text, content_type)
+    stem = os.path.splitext(filename)[0] if filename else f'{content_type}_{uuid.uuid4().hex}'
+    filepath = f'/tmp/{stem}.{ext}'
+    with open(filepath, 'wb') as f:
+        f.write(audio)
     return filepath
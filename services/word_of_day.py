@@ -0,0 +1,82 @@
+"""Personalized Word of the Day.
+
+A nightly batch job fills each user's queue of candidates (several users per
+Gemini request), skipping words already in their flashcards. Delivery at 09:00
+then only pops the next candidate and falls back to live generation when the
+queue is empty. A manual /wod generates a word live, so it never takes the
+word reserved for the next scheduled delivery.
+"""
+import logging
+
+from services.database import get_flashcards, count_wod_candidates, save_wod_candidates, pop_wod_candidate
+from services.gemini_ai import generate_word_candidates, generate_word_of_day
+from services.known_words import known_words
+
+logger = logging.getLogger(__name__)
+
+WOD_BUFFER = 3          # Candidates kept queued per user
+USERS_PER_REQUEST = 5   # Users batched into one Gemini request
+RECENT_WORDS = 30       # Known words listed in the prompt (the index filters the rest)
+
+async def precompute_word_of_day(user_ids: list):
+    """Top up every user's candidate queue. Returns number of candidates saved."""
+    needs = {}
+    for user_id in user_ids:
+        try:
+            missing = WOD_BUFFER - await count_wod_candidates(user_id)
+            if missing > 0:
+                needs[user_id] = missing
+        except Exception as e:
+            logger.error(f"WOD precompute: could not count candidates for {user_id}: {e}")
+
+    saved = 0
+    pending = list(needs)
+    for start in range(0, len(pending), USERS_PER_REQUEST):
+        chunk = pending[start:start + USERS_PER_REQUEST]
+        try:
+            students = {}
+            for i, user_id in enumerate(chunk, 1):
+                await known_words.ensure_loaded(user_id)
+                recent = await get_flashcards(user_id, limit=RECENT_WORDS)
+                students[str(i)] = [card['word'] for card in recent or []]
+
+            # Ask for a few extra to survive filtering
+            batch = await generate_word_candidates(students, count=WOD_BUFFER + 2)
+
+            for i, user_id in enumerate(chunk, 1):
+                fresh, seen = [], set()
+                for candidate in batch.get(str(i), []):
+                    key = candidate['word'].lower()
+                    if key in seen or known_words.contains(user_id, candidate['word']):
+                        continue
+                    seen.add(key)
+                    fresh.append(candidate)
+                fresh = fresh[:needs[user_id]]
+                await save_wod_candidates(fresh, user_id)
+                saved += len(fresh)
+        except Exception as e:
+            logger.error(f"WOD precompute failed for users {chunk}: {e}")
+
+    logger.info(f"WOD precompute: saved {saved} candidates for {len(needs)} users")
+    return saved
+
+async def next_word_of_day(user_id: int, use_queue: bool = True) -> dict:
+    """Next word the user does not know yet: precomputed if possible, else live."""
+    await known_words.ensure_loaded(user_id)
+
+    candidate = await pop_wod_candidate(user_id) if use_queue else None
+    while candidate:
+        # The user may have looked the word up since it was queued
+        if not known_words.contains(user_id, candidate['word']):
+            return candidate
+        candidate = await pop_wod_candidate(user_id)
+
+    recent = await get_flashcards(user_id, limit=RECENT_WORDS)
+    exclude = [card['word'] for card in recent or []]
+    wod = None
+    for _ in range(3):
+        wod = await generate_word_of_day(exclude)
+        if wod['word'] and not known_words.contains(user_id, wod['word']):
+            break
+        exclude.append(wod['word'])
+    return wod
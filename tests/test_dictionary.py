@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from services.dictionary import Dictionary, build_index, VOCABULARY_CSV
+
+COMMON_WORDS = ['the', 'new', 'even', 'app', 'fee', 'she', 'ear', 'on', 'commit', 'simple', 'happy']
+
+
+@pytest.fixture
+def dictionary(tmp_path):
+    overlay = tmp_path / 'overlay.jsonl'
+    with open(overlay, 'w', encoding='utf-8') as f:
+        for word in COMMON_WORDS:
+            f.write(json.dumps({'word': word, 'definition': f'definition of {word}', 'chinese': '', 'example': ''}) + '\n')
+    index = tmp_path / 'dictionary.idx'
+    build_index(str(index), VOCABULARY_CSV, str(overlay))
+    return Dictionary(str(index), str(tmp_path / 'new_overlay.jsonl'))
+
+
+@pytest.mark.parametrize('word, base', [
+    ('leverage', 'leverage'),
+    ('Leveraging', 'leverage'),
+    ('leveraged', 'leverage'),
+    ('negotiating', 'negotiate'),
+    ('stakeholders', 'stakeholder'),
+    ('diversifies', 'diversify'),
+    ('committed', 'commit'),
+    ('simply', 'simple'),
+    ('happily', 'happy'),
+])
+def test_inflected_words_resolve_to_their_base(dictionary, word, base):
+    assert dictionary.lookup(word)['word'] == base
+
+
+@pytest.mark.parametrize('word', [
+    'thing', 'news', 'evening', 'apply', 'feed', 'shed', 'early', 'only',
+    'merged', 'merging', 'merges',
+])
+def test_words_that_only_look_inflected_are_not_matched(dictionary, word):
+    assert dictionary.lookup(word) is None
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('telegram')
+
+from polling import PollingRunner, UpdateJournal
+
+
+class FakeUpdate:
+    def __init__(self, update_id, chat_id):
+        self.update_id = update_id
+        self.chat_id = chat_id
+
+    @property
+    def effective_chat(self):
+        return type('Chat', (), {'id': self.chat_id})()
+
+    def to_dict(self):
+        return telegram_update(self.update_id, self.chat_id).to_dict()
+
+
+def telegram_update(update_id, chat_id):
+    from telegram import Update
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {'message_id': update_id, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}, 'text': 'hi'},
+    }, None)
+
+
+class FakeBot:
+    """Minimal getUpdates server: returns up to `limit` unconfirmed updates, long-polls otherwise."""
+
+    def __init__(self):
+        self.updates = []
+        self.requests = 0
+
+    def send(self, update_id, chat_id):
+        self.updates.append(FakeUpdate(update_id, chat_id))
+
+    async def delete_webhook(self):
+        pass
+
+    async def get_updates(self, offset=None, timeout=0, limit=100, **kwargs):
+        self.requests += 1
+        deadline = time.monotonic() + timeout
+        while True:
+            if offset is not None:
+                self.updates = [u for u in self.updates if u.update_id >= offset]
+            if self.updates or time.monotonic() >= deadline:
+                return list(self.updates[:limit])
+            await asyncio.sleep(0.01)
+
+
+class FakeApplication:
+    def __init__(self, slow_chat=None, slow_seconds=0):
+        self.bot = FakeBot()
+        self.slow_chat = slow_chat
+        self.slow_seconds = slow_seconds
+        self.done_at = {}
+        self.order = []
+
+    async def process_update(self, update):
+        if update.effective_chat.id == self.slow_chat:
+            await asyncio.sleep(self.slow_seconds)
+        self.order.append(update.update_id)
+        self.done_at[update.update_id] = time.monotonic()
+
+
+async def wait_for(condition, seconds):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def stop(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_slow_update_in_one_chat_does_not_delay_other_chats(tmp_path):
+    async def scenario():
+        application = FakeApplication(slow_chat=100, slow_seconds=3)
+        runner = PollingRunner(application, timeout=2, journal_path=str(tmp_path / 'journal.jsonl'))
+        task = asyncio.create_task(runner.run())
+
+        application.bot.send(1, chat_id=100)
+        await asyncio.sleep(0.3)  # Chat 100's update is now in flight
+        sent_at = time.monotonic()
+        application.bot.send(2, chat_id=200)
+
+        await wait_for(lambda: 2 in application.done_at, 5)
+        latency = application.done_at.get(2, float('inf')) - sent_at
+        slow_still_running = 1 not in application.done_at
+        await stop(task)
+        return latency, slow_still_running
+
+    latency, slow_still_running = asyncio.run(scenario())
+    assert slow_still_running
+    assert latency < 1.0
+
+
+def test_more_than_one_page_of_updates_behind_a_slow_update(tmp_path):
+    async def scenario():
+        application = FakeApplication(slow_chat=100, slow_seconds=3)
+        runner = PollingRunner(application, timeout=1, journal_path=str(tmp_path / 'journal.jsonl'))
+        application.bot.send(1, chat_id=100)
+        for update_id in range(2, 252):
+            application.bot.send(update_id, chat_id=1000 + update_id)
+        task = asyncio.create_task(runner.run())
+
+        await wait_for(lambda: len(application.done_at) >= 250, 2)
+        others_done = len([u for u in application.done_at if u != 1])
+        requests = application.bot.requests
+        await stop(task)
+        return others_done, requests
+
+    others_done, requests = asyncio.run(scenario())
+    assert others_done == 250
+    assert requests < 10  # No re-downloading of the same page
+
+
+def test_updates_from_one_chat_are_processed_in_order(tmp_path):
+    async def scenario():
+        application = FakeApplication()
+        process = application.process_update
+
+        async def slow_first(update):
+            await asyncio.sleep(0.05 if update.update_id == 1 else 0)
+            await process(update)
+
+        application.process_update = slow_first
+        runner = PollingRunner(application, timeout=1, journal_path=str(tmp_path / 'journal.jsonl'))
+        task = asyncio.create_task(runner.run())
+        for update_id in (1, 2, 3):
+            application.bot.send(update_id, chat_id=100)
+        await wait_for(lambda: len(application.order) >= 3, 2)
+        await stop(task)
+        return application.order
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+
+
+def test_unfinished_updates_are_replayed_after_a_restart(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = UpdateJournal(path)
+    for update_id in (7, 8, 9):
+        journal.add(telegram_update(update_id, chat_id=100))
+    journal.done(8)
+    journal.close()  # The process stopped while 7 and 9 were still in flight
+
+    async def scenario():
+        application = FakeApplication()
+        runner = PollingRunner(application, timeout=1, journal_path=path)
+        task = asyncio.create_task(runner.run())
+        await wait_for(lambda: len(application.order) >= 2, 2)
+        await stop(task)
+        return application.order, runner.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == [7, 9]
+    assert stats['next_offset'] == 10
+    assert UpdateJournal(path).load() == []
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from services.resilience import Dependency, CircuitOpenError, HEDGE_MIN_SAMPLES
+
+
+class BadRequest(Exception):
+    pass
+
+
+def test_client_errors_do_not_open_the_breaker():
+    async def scenario():
+        dependency = Dependency('test-client-errors', failure_threshold=3, client_errors=(BadRequest,))
+
+        async def bad_request():
+            raise BadRequest("unsupported audio")
+
+        for _ in range(10):
+            with pytest.raises(BadRequest):
+                await dependency.call(bad_request)
+        return dependency
+
+    dependency = asyncio.run(scenario())
+    assert dependency.breaker.state == 'closed'
+    assert dependency.stats()['client_failures'] == 10
+
+
+def test_backend_errors_open_the_breaker():
+    async def scenario():
+        dependency = Dependency('test-backend-errors', failure_threshold=3, client_errors=(BadRequest,))
+
+        async def unavailable():
+            raise ConnectionError("503")
+
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await dependency.call(unavailable)
+        with pytest.raises(CircuitOpenError):
+            await dependency.call(unavailable)
+
+    asyncio.run(scenario())
+
+
+def test_hedge_delay_is_tracked_per_operation():
+    async def scenario():
+        dependency = Dependency('test-hedging', hedge=True)
+        attempts = []
+
+        async def respond(seconds):
+            attempts.append(seconds)
+            await asyncio.sleep(seconds)
+            return seconds
+
+        # Fast text calls must not make slower audio calls look like stragglers
+        for _ in range(HEDGE_MIN_SAMPLES):
+            await dependency.call(lambda: respond(0.001), operation='text')
+        for _ in range(HEDGE_MIN_SAMPLES):
+            await dependency.call(lambda: respond(0.05), operation='audio')
+        return dependency.hedges, len(attempts)
+
+    hedges, attempts = asyncio.run(scenario())
+    assert hedges == 0
+    assert attempts == 2 * HEDGE_MIN_SAMPLES
+
+
+def test_hedge_is_skipped_without_a_free_slot():
+    from services.resilience import hedged
+
+    async def scenario(acquire_slot):
+        attempts = []
+
+        async def respond():
+            attempts.append(1)
+            await asyncio.sleep(0.05)
+            return 'ok'
+
+        result = await hedged(respond, delay=0.01, acquire_slot=acquire_slot)
+        return result, len(attempts)
+
+    released = []
+    assert asyncio.run(scenario(lambda: None)) == ('ok', 1)
+    assert asyncio.run(scenario(lambda: lambda: released.append(1))) == ('ok', 2)
+    assert released == [1]
@@ -0,0 +1,98 @@
+import asyncio
+
+from services.scheduler import AIScheduler, INTERACTIVE, BACKGROUND
+
+
+def make_scheduler(**kwargs):
+    return AIScheduler(capacity=4, weights={INTERACTIVE: 4, BACKGROUND: 1}, interactive_target=2.0, **kwargs)
+
+
+def test_background_jobs_leave_slots_for_interactive_calls():
+    async def scenario():
+        scheduler = make_scheduler(background_max=3)
+        release = asyncio.Event()
+
+        async def job(user):
+            async with scheduler.slot(BACKGROUND, user):
+                await release.wait()
+
+        jobs = [asyncio.create_task(job(user)) for user in range(10)]
+        await asyncio.sleep(0)
+        background_active = scheduler.active[BACKGROUND]
+
+        # A user message arriving now gets a slot without waiting for any job
+        await asyncio.wait_for(scheduler.acquire(INTERACTIVE, 'user'), timeout=0.1)
+        interactive_active = scheduler.active[INTERACTIVE]
+        scheduler.release(INTERACTIVE)
+
+        release.set()
+        await asyncio.gather(*jobs)
+        return background_active, interactive_active, scheduler.granted[BACKGROUND]
+
+    background_active, interactive_active, background_granted = asyncio.run(scenario())
+    assert background_active == 3
+    assert interactive_active == 1
+    assert background_granted == 10
+
+
+def test_background_max_defaults_below_capacity():
+    assert make_scheduler().background_max == 2
+    assert AIScheduler(capacity=1, weights={INTERACTIVE: 1, BACKGROUND: 1}, interactive_target=2.0).background_max == 1
+
+
+def test_interactive_caller_promotes_background_leader(monkeypatch):
+    import services.singleflight as singleflight
+    from services.scheduler import set_ai_context
+
+    scheduler = make_scheduler(background_max=1)
+    monkeypatch.setattr(singleflight, 'ai_scheduler', scheduler)
+
+    async def scenario():
+        flight = singleflight.SingleFlight('test')
+        release = asyncio.Event()
+
+        async def job():
+            async with scheduler.slot(BACKGROUND, 'job'):
+                await release.wait()
+
+        async def lookup():
+            async with scheduler.slot():
+                return 'definition'
+
+        async def background_lookup():
+            set_ai_context(BACKGROUND)
+            return await flight.do('word', lookup)
+
+        blocker = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        leader = asyncio.create_task(background_lookup())
+        await asyncio.sleep(0)
+        queued = scheduler.stats()[BACKGROUND]['queued']
+
+        # The user asks for the same word: served at interactive priority
+        result = await asyncio.wait_for(flight.do('word', lookup), timeout=0.1)
+        leader_result = await leader
+        release.set()
+        await blocker
+        return queued, result, leader_result, flight.stats()['promoted']
+
+    queued, result, leader_result, promoted = asyncio.run(scenario())
+    assert queued == 1
+    assert result == leader_result == 'definition'
+    assert promoted == 1
+
+
+def test_extra_slots_only_come_from_spare_capacity():
+    async def scenario():
+        scheduler = make_scheduler()
+        for _ in range(scheduler.capacity - 1):
+            await scheduler.acquire(INTERACTIVE, 'user')
+        release = scheduler.try_acquire(INTERACTIVE)
+        full = scheduler.try_acquire(INTERACTIVE)
+        release()
+        return release, full, sum(scheduler.active.values())
+
+    release, full, active = asyncio.run(scenario())
+    assert release is not None
+    assert full is None
+    assert active == 3
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight('test')
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key.upper()
+
+        results = await asyncio.gather(*(flight.do('a', fetch, 'a') for _ in range(5)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ['A'] * 5
+    assert calls == ['a']
+    assert stats['coalesced'] == 4
+
+
+def test_cancelled_leader_fails_waiters_without_cancelling_them():
+    async def scenario():
+        flight = SingleFlight('test')
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(flight.do('a', slow))
+        await started.wait()
+        waiter = asyncio.create_task(flight.do('a', slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        return leader, waiter
+
+    async def run():
+        leader, waiter = await scenario()
+        assert leader.cancelled()
+        with pytest.raises(RuntimeError):
+            await waiter
+        assert not waiter.cancelled()
+
+    asyncio.run(run())